@@ -0,0 +1,52 @@
+import threading
+import time
+from collections import deque
+
+
+# 按字符数粗略估算token数（中英文混合文本约每4个字符1个token）
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(*texts: str, max_tokens: int = 1000) -> int:
+    """估算一次请求占用的token额度：提示词token + 最大输出token（服务端按此预扣TPM）"""
+    return sum(len(text) for text in texts) // CHARS_PER_TOKEN + max_tokens
+
+
+class RateLimiter:
+    """按提供商配置的每分钟请求数(RPM)/token数(TPM)限流，线程安全
+
+    并发请求在额度用尽时排队等待最早的请求滑出60秒窗口，而不是一起撞上429再各自退避
+    """
+
+    def __init__(self, requests_per_minute: int = None, tokens_per_minute: int = None, window: float = 60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.window = window
+        self._events = deque()  # (发出时间, token数)
+        self._tokens_in_window = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, tokens: int = 0):
+        """阻塞直到本次请求可以在限额内发出"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._events and now - self._events[0][0] >= self.window:
+                    self._tokens_in_window -= self._events.popleft()[1]
+
+                if self._fits(tokens):
+                    self._events.append((now, tokens))
+                    self._tokens_in_window += tokens
+                    return
+
+                self._cond.wait(timeout=self._events[0][0] + self.window - now)
+
+    def _fits(self, tokens: int) -> bool:
+        # 窗口为空时总是放行，避免单个超过TPM的请求永远等待
+        if not self._events:
+            return True
+        if self.requests_per_minute and len(self._events) >= self.requests_per_minute:
+            return False
+        if self.tokens_per_minute and self._tokens_in_window + tokens > self.tokens_per_minute:
+            return False
+        return True
@@ -0,0 +1,22 @@
+import functools
+import openai
+
+
+@functools.lru_cache(maxsize=8)
+def openai_session(api_key: str, base_url: str = None) -> openai.OpenAI:
+    """按 (api_key, base_url) 复用同一个OpenAI兼容客户端及其连接池"""
+    return openai.OpenAI(
+        api_key=api_key,
+        base_url=base_url
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def anthropic_session(api_key: str, base_url: str = None, http_client=None):
+    """按 (api_key, base_url, http_client) 复用同一个Anthropic客户端及其连接池"""
+    import anthropic
+    return anthropic.Anthropic(
+        api_key=api_key,
+        base_url=base_url,
+        http_client=http_client
+    )
@@ -2,11 +2,13 @@ import anthropic
 from typing import Dict, Any
 import time
 
+from api_clients._session_pool import anthropic_session
+
 class AnthropicClient:
     """Anthropic API客户端 - 使用官方anthropic包"""
     
-    def __init__(self, api_key: str, base_url: str = None, model: str = "claude-3-5-sonnet-20241022"):
-        self.client = anthropic.Anthropic(api_key=api_key)
+    def __init__(self, api_key: str, base_url: str = None, model: str = "claude-3-5-sonnet-20241022", session: anthropic.Anthropic = None):
+        self.client = session or anthropic_session(api_key, base_url)
         self.model = model
         
     def generate_response(self, 
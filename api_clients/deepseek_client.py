@@ -2,14 +2,14 @@ import openai
 from typing import Dict, Any, Optional
 import time
 
+from api_clients._session_pool import openai_session
+
 class DeepseekClient:
     """Deepseek API客户端"""
     
-    def __init__(self, api_key: str, base_url: str = "https://api.deepseek.com/v1", model: str = "deepseek-chat"):
-        self.client = openai.OpenAI(
-            api_key=api_key,
-            base_url=base_url
-        )
+    def __init__(self, api_key: str, base_url: str = "https://api.deepseek.com/v1", model: str = "deepseek-chat", session: openai.OpenAI = None):
+        # 同一 (api_key, base_url) 的客户端共享连接池，避免重复TLS握手
+        self.client = session or openai_session(api_key, base_url)
         self.model = model
         
     def generate_response(self, 
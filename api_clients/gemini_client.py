@@ -8,7 +8,7 @@ from urllib3.util.retry import Retry
 class GeminiClient:
     """Gemini API客户端 - 使用原生REST API"""
     
-    def __init__(self, api_key: str, model: str = "gemini-2.0-flash"):
+    def __init__(self, api_key: str, model: str = "gemini-2.0-flash", pool_maxsize: int = 32):
         self.api_key = api_key
         self.model = model
         self.base_url = "https://generativelanguage.googleapis.com/v1beta"
@@ -20,7 +20,8 @@ class GeminiClient:
             backoff_factor=1,
             status_forcelist=[429, 500, 502, 503, 504],
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # 连接池需容纳工作流程中并发的全部请求（默认10个），否则多出的连接用完即被丢弃，下次请求重新握手
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=pool_maxsize)
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
         
@@ -1,16 +1,20 @@
 import openai
 from typing import Dict, Any, Optional
+import json
 import time
 
+from api_clients._session_pool import openai_session
+
 class OpenAIClient:
     """OpenAI API客户端"""
     
-    def __init__(self, api_key: str, base_url: str = None, model: str = "gpt-4"):
-        self.client = openai.OpenAI(
-            api_key=api_key,
-            base_url=base_url
-        )
+    def __init__(self, api_key: str, base_url: str = None, model: str = "gpt-4", session: openai.OpenAI = None):
+        # 同一 (api_key, base_url) 的客户端共享连接池，避免重复TLS握手
+        self.client = session or openai_session(api_key, base_url)
         self.model = model
+        self._api_key = api_key
+        self._base_url = base_url
+        self._async_client = None
         
     def generate_response(self, 
                          system_prompt: str, 
@@ -29,20 +33,39 @@ class OpenAIClient:
                 temperature=temperature
             )
             
-            raw_response = response.choices[0].message.content
-            
-            # 尝试提取和解析JSON
-            parsed_data = self._extract_and_parse_json(raw_response)
+            return self._build_result(response)
             
+        except Exception as e:
             return {
-                'success': True,
-                'response': raw_response,
-                'parsed_data': parsed_data,
-                'organ_name': parsed_data.get('organ_name', ''),
-                'anatomical_locations': parsed_data.get('anatomical_locations', []),
-                'usage': response.usage.dict() if response.usage else None,
+                'success': False,
+                'error': str(e),
                 'model': self.model
             }
+    
+    async def agenerate_response(self, 
+                                 system_prompt: str, 
+                                 user_prompt: str, 
+                                 max_tokens: int = 1000,
+                                 temperature: float = 0.1) -> Dict[str, Any]:
+        """异步生成回复，便于多个请求并发发出"""
+        try:
+            if self._async_client is None:
+                self._async_client = openai.AsyncOpenAI(
+                    api_key=self._api_key,
+                    base_url=self._base_url
+                )
+            
+            response = await self._async_client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+            
+            return self._build_result(response)
             
         except Exception as e:
             return {
@@ -51,6 +74,23 @@ class OpenAIClient:
                 'model': self.model
             }
     
+    def _build_result(self, response) -> Dict[str, Any]:
+        """将API响应整理为统一的结果字典"""
+        raw_response = response.choices[0].message.content
+        
+        # 尝试提取和解析JSON
+        parsed_data = self._extract_and_parse_json(raw_response)
+        
+        return {
+            'success': True,
+            'response': raw_response,
+            'parsed_data': parsed_data,
+            'organ_name': parsed_data.get('organ_name', ''),
+            'anatomical_locations': parsed_data.get('anatomical_locations', []),
+            'usage': response.usage.dict() if response.usage else None,
+            'model': self.model
+        }
+    
     def _extract_and_parse_json(self, text: str) -> Dict[str, Any]:
         """提取和解析JSON内容"""
         try:
@@ -108,3 +148,83 @@ class OpenAIClient:
             time.sleep(0.1)
             
         return results
+    
+    def run_batch(self, 
+                  requests: list, 
+                  input_path, 
+                  max_tokens: int = 1000,
+                  temperature: float = 0.1,
+                  poll_interval: float = 30) -> Dict[str, Dict[str, Any]]:
+        """通过Batch API离线提交一批请求并等待完成
+        
+        requests 为 (custom_id, system_prompt, user_prompt) 列表，
+        返回 {custom_id: 与 generate_response 相同格式的结果}
+        """
+        # 每行一个请求，请求体与 generate_response 保持一致
+        with open(input_path, 'w', encoding='utf-8') as f:
+            for custom_id, system_prompt, user_prompt in requests:
+                line = {
+                    'custom_id': custom_id,
+                    'method': 'POST',
+                    'url': '/v1/chat/completions',
+                    'body': {
+                        'model': self.model,
+                        'messages': [
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        'max_tokens': max_tokens,
+                        'temperature': temperature
+                    }
+                }
+                f.write(json.dumps(line, ensure_ascii=False) + '\n')
+        
+        with open(input_path, 'rb') as f:
+            input_file = self.client.files.create(file=f, purpose='batch')
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h'
+        )
+        print(f"📤 已提交批处理任务 {batch.id}，共 {len(requests)} 个请求")
+        
+        while batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+            time.sleep(poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+            counts = batch.request_counts
+            if counts:
+                print(f"⏳ 批处理 {batch.id}: {batch.status} ({counts.completed}/{counts.total})")
+        
+        results = {
+            custom_id: {'success': False, 'error': f'批处理未返回结果 (状态: {batch.status})', 'model': self.model}
+            for custom_id, _, _ in requests
+        }
+        # 成功的请求写入 output_file，失败的请求写入 error_file，两者行格式相同
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                self._collect_batch_results(self.client.files.content(file_id).text, results)
+        
+        return results
+    
+    def _collect_batch_results(self, content: str, results: Dict[str, Dict[str, Any]]):
+        """按 custom_id 将批处理结果文件中的每一行写入 results，单行出错只影响该请求"""
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                custom_id = item['custom_id']
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"⚠️  无法解析的批处理结果行，已跳过: {e}")
+                continue
+            
+            try:
+                response = item.get('response') or {}
+                if item.get('error') or response.get('status_code') != 200:
+                    error = item.get('error') or (response.get('body') or {}).get('error')
+                    results[custom_id] = {'success': False, 'error': str(error), 'model': self.model}
+                    continue
+                completion = openai.types.chat.ChatCompletion.model_validate(response['body'])
+                results[custom_id] = self._build_result(completion)
+            except Exception as e:
+                results[custom_id] = {'success': False, 'error': f'批处理结果无效: {e}', 'model': self.model}
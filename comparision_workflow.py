@@ -25,6 +25,41 @@ from evaluator import Evaluator
 from utils.logger import ReportLogger
 
 
+# RAG增强Prompt模板，固定的说明文字只在模块加载时构建一次
+_AUGMENTED_PROMPT_TEMPLATE = (
+    "以下是我的症状描述：\n"
+    "{symptom_text}\n"
+    "\n"
+    "下面给你一些来自检索系统（RAG）的相关参考，请在回答时以这些参考为主要依据进行推理与归纳，同时严格输出JSON结构：\n"
+    "参考-主检索：\n"
+    "{primary_block}\n"
+    "\n"
+    "参考-相关诊断：\n"
+    "{context_block}"
+)
+
+
+def _format_reference(ref: Dict[str, Any]) -> str:
+    """将一条RAG参考格式化为一行：文本，以及对应的器官与解剖位置"""
+    organ_part = ""
+    organ = ref.get('organ')
+    if organ:
+        # organ 可能是字符串或字典
+        if isinstance(organ, str):
+            organ_part = f" | organ: {organ}"
+        elif isinstance(organ, dict):
+            # 常见结构: {'organName': 'xxx', 'anatomicalLocations': [...]}
+            name = organ.get('organName') or organ.get('name') or ''
+            locs = organ.get('anatomicalLocations') or organ.get('locations') or []
+            if isinstance(locs, list):
+                loc_str = ", ".join(locs)
+            else:
+                loc_str = str(locs)
+            organ_part = f" | organ: {name} | locations: {loc_str}" if name or loc_str else ""
+    text = ref.get('text') or ''
+    return f"- {text}{organ_part}".strip()
+
+
 class MainWorkflow:
     """主工作流程类"""
     
@@ -311,40 +346,14 @@ class MainWorkflow:
         if not primary_refs and not context_refs:
             return symptom_text
         
-        def fmt_ref(ref: Dict[str, Any]) -> str:
-            organ_part = ""
-            organ = ref.get('organ')
-            if organ:
-                # organ 可能是字符串或字典
-                if isinstance(organ, str):
-                    organ_part = f" | organ: {organ}"
-                elif isinstance(organ, dict):
-                    # 常见结构: {'organName': 'xxx', 'anatomicalLocations': [...]}
-                    name = organ.get('organName') or organ.get('name') or ''
-                    locs = organ.get('anatomicalLocations') or organ.get('locations') or []
-                    if isinstance(locs, list):
-                        loc_str = ", ".join(locs)
-                    else:
-                        loc_str = str(locs)
-                    organ_part = f" | organ: {name} | locations: {loc_str}" if name or loc_str else ""
-            text = ref.get('text') or ''
-            return f"- {text}{organ_part}".strip()
-        
-        primary_block = "\n".join([fmt_ref(r) for r in primary_refs]) if primary_refs else ""
-        context_block = "\n".join([fmt_ref(r) for r in context_refs]) if context_refs else ""
-        
-        aug_parts = [
-            "以下是我的症状描述：",
-            symptom_text.strip(),
-            "",
-            "下面给你一些来自检索系统（RAG）的相关参考，请在回答时以这些参考为主要依据进行推理与归纳，同时严格输出JSON结构：",
-            "参考-主检索：",
-            primary_block if primary_block else "(无)",
-            "",
-            "参考-相关诊断：",
-            context_block if context_block else "(无)"
-        ]
-        return "\n".join([p for p in aug_parts if p is not None])
+        primary_block = "\n".join(map(_format_reference, primary_refs)) if primary_refs else ""
+        context_block = "\n".join(map(_format_reference, context_refs)) if context_refs else ""
+        
+        return _AUGMENTED_PROMPT_TEMPLATE.format(
+            symptom_text=symptom_text.strip(),
+            primary_block=primary_block or "(无)",
+            context_block=context_block or "(无)"
+        )
     
     def save_results(self, report_results: Dict[str, Any]) -> str:
         """保存单个报告的结果"""
@@ -478,8 +487,9 @@ class MainWorkflow:
                 'a_position': ''
             }
         
-        # 按器官名称分组
+        # 按器官名称分组，所有位置在同一遍遍历中直接去重
         organ_groups = {}
+        unique_locations = set()
         all_diagnoses = set()
         
         for expected in symptom['expected_organs']:
@@ -489,32 +499,20 @@ class MainWorkflow:
                 diagnosis = expected.get('d_diagnosis', '')
                 
                 if organ_name:
-                    if organ_name not in organ_groups:
-                        organ_groups[organ_name] = set()
-                    organ_groups[organ_name].update(locations)
+                    organ_groups.setdefault(organ_name, set()).update(locations)
+                    unique_locations.update(locations)
                 
                 if diagnosis:
                     all_diagnoses.add(diagnosis)
             elif isinstance(expected, str):
-                if expected not in organ_groups:
-                    organ_groups[expected] = set()
-        
-        # 构建结果
-        unique_organs = list(organ_groups.keys())
-        all_unique_locations = []
-        
-        for organ, locations in organ_groups.items():
-            all_unique_locations.extend(list(locations))
-        
-        # 去重位置信息
-        unique_locations = list(set(all_unique_locations))
+                organ_groups.setdefault(expected, set())
         
         return {
             'diag': '; '.join(sorted(all_diagnoses)) if all_diagnoses else symptom.get('diagnosis', ''),
-            'organ': ', '.join(sorted(unique_organs)),
+            'organ': ', '.join(sorted(organ_groups)),
             'a_position': ', '.join(sorted(unique_locations)),
             'organ_distribution': {
-                organ: sorted(list(locations)) for organ, locations in organ_groups.items()
+                organ: sorted(locations) for organ, locations in organ_groups.items()
             }  # 额外添加器官分布详情
         }
     
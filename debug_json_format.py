@@ -1,3 +1,4 @@
+import gzip
 import json
 import sys
 import os
@@ -10,7 +11,9 @@ def debug_report_format(report_path):
         print(f"错误: 文件不存在 -> {report_path}", file=sys.stderr)
         sys.exit(1)
 
-    with open(report_path, 'r', encoding='utf-8') as f:
+    # main_workflow 的详细结果以gzip压缩保存
+    opener = gzip.open if report_path.endswith('.gz') else open
+    with opener(report_path, 'rt', encoding='utf-8') as f:
         data = json.load(f)
 
     print(f"🔍 开始调试文件: {report_path}\n")
@@ -45,7 +48,7 @@ def debug_report_format(report_path):
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("用法: python debug_json_format.py <report_json_path>", file=sys.stderr)
-        print("示例: python debug_json_format.py results/report_diagnostic_4000_evaluation_20250825_214135.json", file=sys.stderr)
+        print("示例: python debug_json_format.py results/report_diagnostic_4000_evaluation_20250825_214135.json.gz", file=sys.stderr)
         sys.exit(1)
     
     report_file = sys.argv[1]
@@ -7,11 +7,13 @@ RAG评估系统 - 主工作流程
 
 import os
 import sys
-import json
+import asyncio
 import argparse
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 
 # 添加src目录到Python路径
@@ -22,33 +24,105 @@ from data_loader import DataLoader
 from api_manager import APIManager
 from evaluator import Evaluator
 from utils.logger import ReportLogger
+from utils.json_io import write_json, write_json_gz, append_jsonl, iter_jsonl
+from utils.response_cache import ResponseCache
+
+
+# 汇总统计的四项评估指标，顺序即指标列的顺序
+_METRIC_KEYS = ('precision', 'recall', 'f1_score', 'overgeneration_penalty')
+
+
+def _column_means(rows: List[Tuple[float, ...]]) -> Tuple[float, ...]:
+    """按列求平均，rows 为等长的指标元组列表"""
+    return tuple(sum(column) / len(rows) for column in zip(*rows))
+
+
+@lru_cache(maxsize=4096)
+def _group_expected(expected_key: Tuple) -> Tuple[str, str, str, Dict[str, List[str]]]:
+    """按器官分组期望结果，返回 (诊断, 器官, 解剖位置, 器官分布)
+
+    expected_key 的元素为 (器官名, 位置元组, 诊断) 或仅有器官名的字符串；
+    结果只取决于期望结果本身，与症状文本无关，可跨症状复用
+    """
+    # 按器官名称分组，所有位置在同一遍遍历中直接去重
+    organ_groups = {}
+    unique_locations = set()
+    all_diagnoses = set()
+    
+    for expected in expected_key:
+        if isinstance(expected, tuple):
+            organ_name, locations, diagnosis = expected
+            
+            if organ_name:
+                organ_groups.setdefault(organ_name, set()).update(locations)
+                unique_locations.update(locations)
+            
+            if diagnosis:
+                all_diagnoses.add(diagnosis)
+        else:
+            organ_groups.setdefault(expected, set())
+    
+    return (
+        '; '.join(sorted(all_diagnoses)),
+        ', '.join(sorted(organ_groups)),
+        ', '.join(sorted(unique_locations)),
+        {organ: sorted(locations) for organ, locations in organ_groups.items()}
+    )
 
 
 class MainWorkflow:
     """主工作流程类"""
     
-    def __init__(self, config_path: str = "config/config.yaml"):
-        """初始化主工作流程"""
+    def __init__(self, config_path: str = "config/config.yaml", verbose: bool = False, use_cache: bool = False):
+        """初始化主工作流程
+
+        Args:
+            config_path: 配置文件路径
+            verbose: 是否在控制台输出逐症状、逐文件的进度信息（始终写入 logs/workflow.log）
+            use_cache: 是否复用 results/.api_cache 中相同症状文本的API响应（默认关闭：模型以非零温度采样，
+                缓存的回答不等同于重新调用；命中缓存的响应带有 'cached': True 标记）
+        """
         self.config = ConfigLoader(config_path)
         self.data_loader = DataLoader()
         self.api_manager = APIManager()
         self.evaluator = Evaluator()
         self.logger = ReportLogger()
+        self.log = self.logger.get_workflow_logger(verbose)
+        
+        # 单个报告内同时处理的症状数量上限、同时处理的报告数量上限，以及加载报告文件的线程数
+        evaluation_config = self.config.config.get('evaluation', {})
+        self.max_concurrency = evaluation_config.get('max_concurrency', 10)
+        self.max_report_workers = evaluation_config.get('max_report_workers', 2)
+        self.max_load_workers = evaluation_config.get('max_load_workers', 16)
+        
+        # 系统提示词在整个工作流程中不变，只读取一次
+        self._system_prompt = self._load_system_prompt()
+        
+        # 本次运行的时间戳，所有结果文件共用；未通过 run_workflow 运行时按调用时间生成
+        self._run_stamp = None
         
         # 创建结果目录
         self.results_dir = Path("results")
         self.results_dir.mkdir(exist_ok=True)
         
+        # 启用缓存时，不同报告中重复的症状文本只调用一次API（按API、模型、系统提示词区分）
+        if use_cache:
+            self.api_manager.response_cache = ResponseCache(self.results_dir / ".api_cache")
+        
         # 创建日志目录
         self.logs_dir = Path("logs")
         self.logs_dir.mkdir(exist_ok=True)
     
     def process_report(self, report_data: Dict[str, Any]) -> Dict[str, Any]:
         """处理单个报告"""
+        return asyncio.run(self.process_report_async(report_data))
+    
+    async def process_report_async(self, report_data: Dict[str, Any]) -> Dict[str, Any]:
+        """处理单个报告（异步版本）"""
         report_id = report_data.get('report_id', 'unknown')
         symptoms = report_data.get('symptoms', [])
         
-        print(f"\n正在处理报告 {report_id}，包含 {len(symptoms)} 个症状")
+        self.log.info(f"正在处理报告 {report_id}，包含 {len(symptoms)} 个症状")
         
         report_results = {
             'report_id': report_id,
@@ -56,135 +130,134 @@ class MainWorkflow:
             'symptoms': []
         }
         
-        # 处理每个症状
-        for symptom_item in symptoms:
-            symptom_id = symptom_item.get('symptom_id', 'unknown')
-            symptom_text = symptom_item.get('symptom_text', '')
+        # 同一报告内的症状互不依赖，并发调用API，结果保持原顺序；
+        # 线程池大小即并发上限（asyncio 默认线程池按CPU数量确定，不适合I/O密集的API调用）
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=max(self.max_concurrency, 1)) as executor:
+            report_results['symptoms'] = await asyncio.gather(*(
+                loop.run_in_executor(executor, self._process_one_symptom, symptom_item)
+                for symptom_item in symptoms
+            ))
+        
+        return report_results
+    
+    def _process_one_symptom(self, symptom_item: Dict[str, Any]) -> Dict[str, Any]:
+        """调用所有API处理单个症状并评估，出错时返回带 error 的症状记录"""
+        symptom_id = symptom_item.get('symptom_id', 'unknown')
+        symptom_text = symptom_item.get('symptom_text', '')
+        
+        self.log.info(f"  处理症状 {symptom_id}: {symptom_text[:50]}...")
+        
+        # 提取期望的器官信息
+        expected_organs = symptom_item.get('expected_results', [])
+        
+        # 调用API处理症状
+        try:
+            api_result = self.api_manager.process_symptom(symptom_item, self._system_prompt)
             
-            print(f"  处理症状 {symptom_id}: {symptom_text[:50]}...")
+            return self._build_symptom_data(symptom_item, api_result)
             
-            # 提取期望的器官信息
-            expected_organs = symptom_item.get('expected_results', [])
+        except Exception as e:
+            error_msg = f"处理症状 {symptom_id} 时出错: {str(e)}"
+            self.log.warning(f"    {error_msg}")
             
-            # 调用API处理症状
-            try:
-                # 加载系统提示词
-                system_prompt_path = Path("prompt/system_prompt.txt")
-                if system_prompt_path.exists():
-                    with open(system_prompt_path, 'r', encoding='utf-8') as f:
-                        system_prompt = f.read().strip()
-                else:
-                    system_prompt = "你是一个医学专家，请根据症状识别相关的器官和解剖位置。"
-                
-                api_result = self.api_manager.process_symptom(symptom_item, system_prompt)
-                
-                # 为每个症状构建完整的数据结构
-                symptom_data = {
-                    'symptom_id': symptom_id,
-                    'diagnosis': symptom_text,
-                    'expected_organs': expected_organs,
-                    'api_responses': {}
-                }
-                
-                # 处理每个API的响应和评估
-                for api_name, response in api_result.items():
-                    api_response_data = {
-                        'response': response.get('response', ''),
-                        'parsed_data': response.get('parsed_data', {}),
-                        'organ_name': response.get('organ_name', ''),
-                        'anatomical_locations': response.get('anatomical_locations', [])
-                    }
-                    
-                    # 评估这个API的响应
-                    if response.get('success') and response.get('parsed_data'):
-                        evaluation = self.evaluator.evaluate_single_response(
-                            api_response=response,
-                            expected_results=expected_organs
-                        )
-                        api_response_data['evaluation'] = evaluation
-                    else:
-                        api_response_data['evaluation'] = {
-                            'overall_score': 0.0,
-                            'precision': 0.0,
-                            'recall': 0.0,
-                            'overgeneration_penalty': 0.0,
-                            'detailed_analysis': 'API调用失败或无有效数据'
-                        }
-                    
-                    symptom_data['api_responses'][api_name] = api_response_data
-                
-                report_results['symptoms'].append(symptom_data)
-                
-            except Exception as e:
-                error_msg = f"处理症状 {symptom_id} 时出错: {str(e)}"
-                print(f"    {error_msg}")
-                
-                # 即使出错也要保存症状的基本信息
-                symptom_data = {
-                    'symptom_id': symptom_id,
-                    'diagnosis': symptom_text,
-                    'expected_organs': expected_organs,
-                    'error': str(e),
-                    'api_responses': {}
+            # 即使出错也要保存症状的基本信息
+            symptom_data = {
+                'symptom_id': symptom_id,
+                'diagnosis': symptom_text,
+                'expected_organs': expected_organs,
+                'error': str(e),
+                'api_responses': {}
+            }
+            return symptom_data
+    
+    def _build_symptom_data(self, symptom_item: Dict[str, Any], api_result: Dict[str, Any]) -> Dict[str, Any]:
+        """根据各API的响应构建症状记录并逐个评估"""
+        symptom_id = symptom_item.get('symptom_id', 'unknown')
+        symptom_text = symptom_item.get('symptom_text', '')
+        expected_organs = symptom_item.get('expected_results', [])
+        
+        # 为每个症状构建完整的数据结构
+        symptom_data = {
+            'symptom_id': symptom_id,
+            'diagnosis': symptom_text,
+            'expected_organs': expected_organs,
+            'api_responses': {}
+        }
+        
+        # 处理每个API的响应和评估
+        for api_name, response in api_result.items():
+            api_response_data = {
+                'response': response.get('response', ''),
+                'parsed_data': response.get('parsed_data', {}),
+                'organ_name': response.get('organ_name', ''),
+                'anatomical_locations': response.get('anatomical_locations', [])
+            }
+            if response.get('cached'):
+                api_response_data['cached'] = True
+            
+            # 评估这个API的响应
+            if response.get('success') and response.get('parsed_data'):
+                evaluation = self.evaluator.evaluate_single_response(
+                    api_response=response,
+                    expected_results=expected_organs
+                )
+                api_response_data['evaluation'] = evaluation
+            else:
+                api_response_data['evaluation'] = {
+                    'overall_score': 0.0,
+                    'precision': 0.0,
+                    'recall': 0.0,
+                    'overgeneration_penalty': 0.0,
+                    'detailed_analysis': 'API调用失败或无有效数据'
                 }
-                report_results['symptoms'].append(symptom_data)
+            
+            symptom_data['api_responses'][api_name] = api_response_data
         
-        return report_results
+        return symptom_data
     
     def save_results(self, report_results: Dict[str, Any]) -> str:
         """保存单个报告的结果"""
         report_id = report_results['report_id']
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = self._run_stamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+        
+        # 三个结果文件共用同一前缀与时间戳
+        stem = f"report_{report_id}"
+        # 详细结果只供程序读取，紧凑格式并gzip压缩；其余两个文件供人阅读，保留缩进
+        detailed_path = self.results_dir / f"{stem}_evaluation_{timestamp}.json.gz"
+        standardized_path = self.results_dir / f"{stem}_evaluation_standardized_{timestamp}.json"
+        user_format_path = self.results_dir / f"{stem}_user_format_{timestamp}.json"
         
         # 保存详细结果
-        detailed_filename = f"report_{report_id}_evaluation_{timestamp}.json"
-        detailed_path = self.results_dir / detailed_filename
+        write_json_gz(report_results, detailed_path)
         
-        with open(detailed_path, 'w', encoding='utf-8') as f:
-            json.dump(report_results, f, ensure_ascii=False, indent=2)
+        # 标准化结果与用户格式共用同一份症状条目，只构建一次
+        entries = self._build_symptom_entries(report_results)
         
         # 保存标准化结果
-        standardized_results = self._standardize_results(report_results)
-        standardized_filename = f"report_{report_id}_evaluation_standardized_{timestamp}.json"
-        standardized_path = self.results_dir / standardized_filename
-        
-        with open(standardized_path, 'w', encoding='utf-8') as f:
-            json.dump(standardized_results, f, ensure_ascii=False, indent=2)
+        write_json(self._standardize_results(report_results, entries), standardized_path)
         
         # 保存用户期望格式（扁平化，每个症状独立）
-        user_format_results = self._generate_user_format(report_results)
-        user_format_filename = f"report_{report_id}_user_format_{timestamp}.json"
-        user_format_path = self.results_dir / user_format_filename
-        
-        with open(user_format_path, 'w', encoding='utf-8') as f:
-            json.dump(user_format_results, f, ensure_ascii=False, indent=2)
+        write_json(self._generate_user_format(report_results, entries), user_format_path)
         
-        print(f"结果已保存到:")
-        print(f"  详细结果: {detailed_path}")
-        print(f"  标准化结果: {standardized_path}")
-        print(f"  用户格式: {user_format_path}")
+        self.log.info(f"结果已保存到:")
+        self.log.info(f"  详细结果: {detailed_path}")
+        self.log.info(f"  标准化结果: {standardized_path}")
+        self.log.info(f"  用户格式: {user_format_path}")
         
         return str(detailed_path)
     
-    def _standardize_results(self, report_results: Dict[str, Any]) -> Dict[str, Any]:
-        """标准化结果格式 - 用户期望的格式"""
-        standardized = {
-            'report_number': report_results['report_id'],
-            'timestamp': report_results['timestamp'],
-            'symptoms': []
-        }
+    def _build_symptom_entries(self, report_results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """构建每个症状的标准化条目，标准化结果与用户格式共用同一份"""
+        entries = []
         
-        # 标准化每个症状的数据
         for symptom_idx, symptom in enumerate(report_results['symptoms']):
-            # 使用智能处理期望结果
+            # 智能处理期望结果 - 按器官分组并去重
             expected_result = self._process_expected_organs(symptom)
             
-            # 构建API响应列表
-            api_responses = []
-            api_number = 1
-            
-            for api_name, response in symptom.get('api_responses', {}).items():
-                api_response_data = {
+            # 构建API响应列表（解剖位置在此拼接一次，两种输出格式共用）
+            api_responses = [
+                {
                     'api_number': api_number,
                     'api_name': api_name,
                     'api_response': {
@@ -193,10 +266,10 @@ class MainWorkflow:
                     },
                     'api_eva': response.get('evaluation', {})
                 }
-                api_responses.append(api_response_data)
-                api_number += 1
+                for api_number, (api_name, response) in enumerate(symptom.get('api_responses', {}).items(), 1)
+            ]
             
-            standardized_symptom = {
+            entry = {
                 'report_number': report_results['report_id'],
                 'symptom_number': symptom_idx + 1,
                 'symptom_name': symptom.get('diagnosis', ''),
@@ -206,53 +279,23 @@ class MainWorkflow:
             
             # 如果有错误信息，也保存
             if 'error' in symptom:
-                standardized_symptom['error'] = symptom['error']
+                entry['error'] = symptom['error']
             
-            standardized['symptoms'].append(standardized_symptom)
+            entries.append(entry)
         
-        return standardized
+        return entries
+    
+    def _standardize_results(self, report_results: Dict[str, Any], entries: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """标准化结果格式 - 用户期望的格式"""
+        return {
+            'report_number': report_results['report_id'],
+            'timestamp': report_results['timestamp'],
+            'symptoms': entries if entries is not None else self._build_symptom_entries(report_results)
+        }
     
-    def _generate_user_format(self, report_results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _generate_user_format(self, report_results: Dict[str, Any], entries: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """生成用户期望的扁平化格式 - 每个症状作为独立条目"""
-        user_format_list = []
-        
-        for symptom_idx, symptom in enumerate(report_results['symptoms']):
-            # 智能处理期望结果 - 按器官分组并去重
-            expected_result = self._process_expected_organs(symptom)
-            
-            # 构建API响应列表
-            api_responses = []
-            api_number = 1
-            
-            for api_name, response in symptom.get('api_responses', {}).items():
-                api_response_data = {
-                    'api_number': api_number,
-                    'api_name': api_name,
-                    'api_response': {
-                        'organ': response.get('organ_name', ''),
-                        'a_position': ', '.join(response.get('anatomical_locations', []))
-                    },
-                    'api_eva': response.get('evaluation', {})
-                }
-                api_responses.append(api_response_data)
-                api_number += 1
-            
-            # 创建用户格式的条目
-            user_format_entry = {
-                'report_number': report_results['report_id'],
-                'symptom_number': symptom_idx + 1,
-                'symptom_name': symptom.get('diagnosis', ''),
-                'expected_result': expected_result,
-                'api_responses': api_responses
-            }
-            
-            # 如果有错误信息，也保存
-            if 'error' in symptom:
-                user_format_entry['error'] = symptom['error']
-            
-            user_format_list.append(user_format_entry)
-        
-        return user_format_list
+        return entries if entries is not None else self._build_symptom_entries(report_results)
     
     def _process_expected_organs(self, symptom: Dict[str, Any]) -> Dict[str, str]:
         """智能处理期望器官数据 - 按器官分组，保留真正的多器官分布"""
@@ -263,147 +306,135 @@ class MainWorkflow:
                 'a_position': ''
             }
         
-        # 按器官名称分组
-        organ_groups = {}
-        all_diagnoses = set()
-        
-        for expected in symptom['expected_organs']:
-            if isinstance(expected, dict):
-                organ_name = expected.get('organName', '')
-                locations = expected.get('anatomicalLocations', [])
-                diagnosis = expected.get('d_diagnosis', '')
-                
-                if organ_name:
-                    if organ_name not in organ_groups:
-                        organ_groups[organ_name] = set()
-                    organ_groups[organ_name].update(locations)
-                
-                if diagnosis:
-                    all_diagnoses.add(diagnosis)
-            elif isinstance(expected, str):
-                if expected not in organ_groups:
-                    organ_groups[expected] = set()
-        
-        # 构建结果
-        unique_organs = list(organ_groups.keys())
-        all_unique_locations = []
-        
-        for organ, locations in organ_groups.items():
-            all_unique_locations.extend(list(locations))
-        
-        # 去重位置信息
-        unique_locations = list(set(all_unique_locations))
+        # 期望结果转为可哈希的键，相同的器官结构（同一症状的多次调用、相似报告）直接命中缓存
+        expected_key = tuple(
+            (expected.get('organName', ''), tuple(expected.get('anatomicalLocations', [])), expected.get('d_diagnosis', ''))
+            if isinstance(expected, dict) else expected
+            for expected in symptom['expected_organs']
+            if isinstance(expected, (dict, str))
+        )
+        diag, organ, a_position, organ_distribution = _group_expected(expected_key)
         
         return {
-            'diag': '; '.join(sorted(all_diagnoses)) if all_diagnoses else symptom.get('diagnosis', ''),
-            'organ': ', '.join(sorted(unique_organs)),
-            'a_position': ', '.join(sorted(unique_locations)),
-            'organ_distribution': {
-                organ: sorted(list(locations)) for organ, locations in organ_groups.items()
-            }  # 额外添加器官分布详情
+            'diag': diag or symptom.get('diagnosis', ''),
+            'organ': organ,
+            'a_position': a_position,
+            'organ_distribution': dict(organ_distribution)  # 额外添加器官分布详情
+        }
+    
+    def _summarize_report(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """计算单个报告的平均指标，报告处理完成后立即调用，汇总时无需保留完整结果"""
+        report_summary = {
+            'report_id': result['report_id'],
+            'symptoms_count': len(result['symptoms']),
+            'metrics': {}
         }
+        
+        # 先对每个症状的各API指标取平均，再对症状取平均；指标按列存放，一次求和
+        symptom_rows = []
+        for symptom in result['symptoms']:
+            api_rows = [
+                tuple(evaluation.get(key, 0) for key in _METRIC_KEYS)
+                for evaluation in (response.get('evaluation', {}) for response in symptom['api_responses'].values())
+                if evaluation and 'precision' in evaluation
+            ]
+            if api_rows:
+                symptom_rows.append(_column_means(api_rows))
+        
+        if symptom_rows:
+            report_summary['metrics'] = {
+                key: mean * 100 for key, mean in zip(_METRIC_KEYS, _column_means(symptom_rows))
+            }
+        
+        return report_summary
     
-    def generate_summary_report(self, all_results: List[Dict[str, Any]]) -> str:
-        """生成汇总报告"""
-        if not all_results:
+    def _summaries_path(self) -> Path:
+        """本次运行的报告指标摘要文件，每行一个 _summarize_report 的结果；汇总报告生成后删除"""
+        return self.results_dir / f"summaries_{self._run_stamp}.jsonl"
+    
+    def generate_summary_report(self, report_summaries: List[Dict[str, Any]]) -> str:
+        """根据各报告的指标摘要（_summarize_report 的结果）生成汇总报告"""
+        if not report_summaries:
             return ""
         
+        # 汇总时间与文件名时间戳取自同一时刻
+        now = datetime.now()
         summary = {
-            'total_reports': len(all_results),
-            'timestamp': datetime.now().isoformat(),
+            'total_reports': len(report_summaries),
+            'timestamp': now.isoformat(),
             'overall_metrics': {
                 'average_precision': 0,
                 'average_recall': 0,
                 'average_f1_score': 0,
                 'average_overgeneration_penalty': 0
             },
-            'report_summaries': []
+            'report_summaries': report_summaries
         }
         
-        total_precision = 0
-        total_recall = 0
-        total_f1 = 0
-        total_overgeneration = 0
-        valid_reports = 0
-        
-        for result in all_results:
-            report_summary = {
-                'report_id': result['report_id'],
-                'symptoms_count': len(result['symptoms']),
-                'metrics': {}
-            }
-            
-            # 计算该报告的平均指标
-            report_precision = 0
-            report_recall = 0
-            report_f1 = 0
-            report_overgeneration = 0
-            valid_symptoms = 0
-            
-            for symptom in result['symptoms']:
-                # 计算该症状的平均指标（如果有多个API）
-                symptom_precision = 0
-                symptom_recall = 0
-                symptom_f1 = 0
-                symptom_overgeneration = 0
-                valid_apis = 0
-                
-                for api_name, response in symptom['api_responses'].items():
-                    evaluation = response.get('evaluation', {})
-                    if evaluation and 'precision' in evaluation:
-                        symptom_precision += evaluation.get('precision', 0)
-                        symptom_recall += evaluation.get('recall', 0)
-                        symptom_f1 += evaluation.get('f1_score', 0)
-                        symptom_overgeneration += evaluation.get('overgeneration_penalty', 0)
-                        valid_apis += 1
-                
-                if valid_apis > 0:
-                    report_precision += symptom_precision / valid_apis
-                    report_recall += symptom_recall / valid_apis
-                    report_f1 += symptom_f1 / valid_apis
-                    report_overgeneration += symptom_overgeneration / valid_apis
-                    valid_symptoms += 1
-            
-            if valid_symptoms > 0:
-                report_summary['metrics'] = {
-                    'precision': (report_precision / valid_symptoms) * 100,
-                    'recall': (report_recall / valid_symptoms) * 100,
-                    'f1_score': (report_f1 / valid_symptoms) * 100,
-                    'overgeneration_penalty': (report_overgeneration / valid_symptoms) * 100
-                }
-                
-                total_precision += report_summary['metrics']['precision']
-                total_recall += report_summary['metrics']['recall']
-                total_f1 += report_summary['metrics']['f1_score']
-                total_overgeneration += report_summary['metrics']['overgeneration_penalty']
-                valid_reports += 1
-            
-            summary['report_summaries'].append(report_summary)
-        
-        # 计算总体平均指标
-        if valid_reports > 0:
+        # 计算总体平均指标（只统计有指标的报告）
+        metric_rows = [
+            tuple(report_summary['metrics'][key] for key in _METRIC_KEYS)
+            for report_summary in report_summaries
+            if report_summary['metrics']
+        ]
+        if metric_rows:
             summary['overall_metrics'] = {
-                'average_precision': total_precision / valid_reports,
-                'average_recall': total_recall / valid_reports,
-                'average_f1_score': total_f1 / valid_reports,
-                'average_overgeneration_penalty': total_overgeneration / valid_reports
+                f'average_{key}': mean for key, mean in zip(_METRIC_KEYS, _column_means(metric_rows))
             }
         
         # 保存汇总报告
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = self._run_stamp or now.strftime("%Y%m%d_%H%M%S")
         summary_filename = f"summary_report_{timestamp}.json"
         summary_path = self.results_dir / summary_filename
         
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, ensure_ascii=False, indent=2)
+        write_json(summary, summary_path)
         
         print(f"\n汇总报告已保存到: {summary_path}")
         return str(summary_path)
     
+    def _load_reports(self, start_id: int = None, end_id: int = None, max_files: int = None) -> List[Dict[str, Any]]:
+        """按ID范围或数量限制加载待处理的报告"""
+        data_path = Path(self.config.config.get('data_path', 'test_set'))
+        
+        if start_id is not None and end_id is not None:
+            file_paths = self.data_loader.get_reports_by_id_range(data_path, start_id, end_id)
+            print(f"找到 {len(file_paths)} 个文件 (ID范围: {start_id}-{end_id})")
+        else:
+            file_paths = self.data_loader.get_diagnostic_files(data_path)
+            print(f"找到 {len(file_paths)} 个文件")
+        
+        # 并发加载每个文件的数据（文件读取与JSON解析期间会释放GIL），map 保持文件顺序
+        with ThreadPoolExecutor(max_workers=max(self.max_load_workers, 1)) as executor:
+            reports = [
+                report_data
+                for report_data in executor.map(self.data_loader.load_report_data, file_paths)
+                if 'error' not in report_data
+            ]
+        
+        print(f"成功加载 {len(reports)} 个报告")
+        
+        if max_files:
+            reports = reports[:max_files]
+            print(f"限制处理文件数量: {max_files}")
+        
+        if not reports:
+            print("没有找到可处理的报告")
+        
+        return reports
+    
+    def _load_system_prompt(self) -> str:
+        """读取系统提示词，文件不存在时使用默认提示词"""
+        system_prompt_path = Path("prompt/system_prompt.txt")
+        if system_prompt_path.exists():
+            return system_prompt_path.read_text(encoding='utf-8').strip()
+        return "你是一个医学专家，请根据症状识别相关的器官和解剖位置。"
+    
     def run_workflow(self, start_id: int = None, end_id: int = None, max_files: int = None, mock_mode: bool = False):
         """运行主工作流程"""
         print("=== RAG评估系统 - 基础版本 ===")
-        print(f"开始时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        start_time = datetime.now()
+        self._run_stamp = start_time.strftime("%Y%m%d_%H%M%S")
+        print(f"开始时间: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
         
         try:
             # 测试API连接
@@ -418,62 +449,180 @@ class MainWorkflow:
             
             # 加载数据
             print("\n2. 加载数据...")
-            data_path = Path(self.config.config.get('data_path', 'test_set'))
-            
-            if start_id is not None and end_id is not None:
-                file_paths = self.data_loader.get_reports_by_id_range(data_path, start_id, end_id)
-                print(f"找到 {len(file_paths)} 个文件 (ID范围: {start_id}-{end_id})")
-            else:
-                file_paths = self.data_loader.get_diagnostic_files(data_path)
-                print(f"找到 {len(file_paths)} 个文件")
-            
-            # 加载每个文件的数据
-            reports = []
-            for file_path in file_paths:
-                report_data = self.data_loader.load_report_data(file_path)
-                if 'error' not in report_data:
-                    reports.append(report_data)
-            
-            print(f"成功加载 {len(reports)} 个报告")
-            
-            if max_files:
-                reports = reports[:max_files]
-                print(f"限制处理文件数量: {max_files}")
-            
+            reports = self._load_reports(start_id, end_id, max_files)
             if not reports:
-                print("没有找到可处理的报告")
                 return
             
             # 处理报告
             print(f"\n3. 开始处理 {len(reports)} 个报告...")
-            all_results = []
+            # 每个报告完成后只把指标摘要追加到本次运行的JSONL文件，完整结果写盘后即释放
+            summaries_path = self._summaries_path()
             
-            for i, report in enumerate(reports, 1):
-                print(f"\n进度: {i}/{len(reports)}")
+            # 多个报告并发调用API；已完成报告的结果交给单独的线程池写盘，与后续报告的API调用重叠
+            with ThreadPoolExecutor(max_workers=max(self.max_report_workers, 1)) as report_executor, \
+                 ThreadPoolExecutor(max_workers=2) as save_executor, \
+                 open(summaries_path, 'wb') as summaries_file:
+                futures = {
+                    report_executor.submit(self.process_report, report): index
+                    for index, report in enumerate(reports)
+                }
+                save_futures = []
                 
-                try:
-                    result = self.process_report(report)
-                    all_results.append(result)
+                for done, future in enumerate(as_completed(futures), 1):
+                    index = futures[future]
+                    self.log.info(f"进度: {done}/{len(reports)}")
                     
-                    # 保存单个报告结果
-                    self.save_results(result)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self.log.error(f"处理报告 {reports[index].get('report_id', 'unknown')} 时出错: {str(e)}")
+                        continue
                     
-                except Exception as e:
-                    print(f"处理报告 {report.get('report_id', 'unknown')} 时出错: {str(e)}")
-                    continue
+                    append_jsonl(self._summarize_report(result), summaries_file)
+                    
+                    # 保存单个报告结果
+                    save_futures.append(save_executor.submit(self.save_results, result))
+                
+                for save_future in save_futures:
+                    try:
+                        save_future.result()
+                    except Exception as e:
+                        self.log.error(f"保存报告结果时出错: {str(e)}")
+            
+            # 从JSONL读回摘要，汇总时保持报告的原始顺序
+            report_order = {report.get('report_id', 'unknown'): index for index, report in enumerate(reports)}
+            report_summaries = sorted(
+                iter_jsonl(summaries_path),
+                key=lambda summary: report_order.get(summary['report_id'], len(reports))
+            )
             
             # 生成汇总报告
-            if all_results:
+            if report_summaries:
                 print(f"\n4. 生成汇总报告...")
-                self.generate_summary_report(all_results)
+                self.generate_summary_report(report_summaries)
+            # 摘要已汇总进报告，中间文件不再保留
+            summaries_path.unlink(missing_ok=True)
             
             print(f"\n=== 工作流程完成 ===")
-            print(f"成功处理: {len(all_results)} 个报告")
+            print(f"成功处理: {len(report_summaries)} 个报告")
             print(f"结果保存在: {self.results_dir}")
+            if self.api_manager.response_cache is not None:
+                print(self.api_manager.response_cache.stats_line())
             
         except Exception as e:
             print(f"工作流程执行出错: {str(e)}")
             logging.error(f"工作流程执行出错: {str(e)}", exc_info=True)
+        finally:
+            self.logger.flush_workflow_logger()
+    
+    @staticmethod
+    def _batch_key(report_id: Any, symptom_index: int) -> str:
+        """批处理中单个症状的 custom_id 前缀：症状ID可能缺失或重复，按其在报告中的序号区分"""
+        return f"{report_id}:{symptom_index}"
+    
+    def _build_batch_requests(self, reports: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """所有报告的症状展开为 (custom_id前缀, 症状文本) 列表"""
+        return [
+            (self._batch_key(report.get('report_id', 'unknown'), index), symptom.get('symptom_text', ''))
+            for report in reports
+            for index, symptom in enumerate(report.get('symptoms', []))
+        ]
+    
+    def _assemble_batch_report(self, report: Dict[str, Any], batch_results: Dict[str, Dict[str, Any]],
+                               api_names, processed_at: str) -> Dict[str, Any]:
+        """按 custom_id 把批处理结果放回报告中的各症状并评估"""
+        report_results = {
+            'report_id': report.get('report_id', 'unknown'),
+            'timestamp': processed_at,
+            'symptoms': []
+        }
+        for index, symptom in enumerate(report.get('symptoms', [])):
+            key = self._batch_key(report_results['report_id'], index)
+            api_result = {api_name: batch_results[f"{key}:{api_name}"] for api_name in api_names}
+            report_results['symptoms'].append(self._build_symptom_data(symptom, api_result))
+        return report_results
+    
+    def run_workflow_batched(self, start_id: int = None, end_id: int = None, max_files: int = None, poll_interval: float = 30):
+        """以Batch API离线方式运行工作流程：所有症状一次性提交，费用约为同步调用的一半"""
+        print("=== RAG评估系统 - 基础版本（批处理模式）===")
+        start_time = datetime.now()
+        self._run_stamp = start_time.strftime("%Y%m%d_%H%M%S")
+        print(f"开始时间: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        try:
+            print("\n1. 初始化API客户端...")
+            if not self.api_manager.initialize_clients(self.config.config):
+                print("API客户端初始化失败，请检查配置")
+                return
+            
+            # 仅支持Batch API的客户端参与批处理
+            batch_clients = {
+                name: client for name, client in self.api_manager.clients.items()
+                if hasattr(client, 'run_batch')
+            }
+            skipped = [name for name in self.api_manager.clients if name not in batch_clients]
+            if skipped:
+                print(f"⚠️  以下API不支持批处理，本次跳过: {', '.join(skipped)}")
+            if not batch_clients:
+                print("没有支持批处理的API客户端，请改用同步模式")
+                return
+            
+            print("\n2. 加载数据...")
+            reports = self._load_reports(start_id, end_id, max_files)
+            if not reports:
+                return
+            
+            system_prompt = self._system_prompt
+            requests = self._build_batch_requests(reports)
+            
+            # 每个API提交一个批处理任务，custom_id = 报告ID:症状序号:API名称
+            print(f"\n3. 提交 {len(requests)} 个症状的批处理任务...")
+            timestamp = self._run_stamp
+            batch_results = {}
+            for api_name, client in batch_clients.items():
+                input_path = self.results_dir / f"batch_input_{api_name}_{timestamp}.jsonl"
+                batch_results.update(client.run_batch(
+                    [(f"{key}:{api_name}", system_prompt, symptom_text) for key, symptom_text in requests],
+                    input_path,
+                    poll_interval=poll_interval
+                ))
+            
+            # 按 custom_id 把结果放回各症状，再在本地评估
+            print(f"\n4. 评估并保存 {len(reports)} 个报告...")
+            # 所有报告的结果在同一时刻到达，处理时间只取一次
+            processed_at = datetime.now().isoformat()
+            summaries_path = self._summaries_path()
+            # 报告写盘交给单独的线程池，与后续报告的评估和序列化重叠
+            with ThreadPoolExecutor(max_workers=2) as save_executor, \
+                 open(summaries_path, 'wb') as summaries_file:
+                save_futures = []
+                for report in reports:
+                    report_results = self._assemble_batch_report(report, batch_results, batch_clients, processed_at)
+                    
+                    append_jsonl(self._summarize_report(report_results), summaries_file)
+                    save_futures.append(save_executor.submit(self.save_results, report_results))
+                
+                for save_future in save_futures:
+                    try:
+                        save_future.result()
+                    except Exception as e:
+                        self.log.error(f"保存报告结果时出错: {str(e)}")
+            
+            report_summaries = list(iter_jsonl(summaries_path))
+            
+            print(f"\n5. 生成汇总报告...")
+            self.generate_summary_report(report_summaries)
+            summaries_path.unlink(missing_ok=True)
+            
+            print(f"\n=== 工作流程完成 ===")
+            print(f"成功处理: {len(report_summaries)} 个报告")
+            print(f"结果保存在: {self.results_dir}")
+            
+        except Exception as e:
+            print(f"工作流程执行出错: {str(e)}")
+            logging.error(f"工作流程执行出错: {str(e)}", exc_info=True)
+        finally:
+            self.logger.flush_workflow_logger()
 
 
 def main():
@@ -483,18 +632,28 @@ def main():
     parser.add_argument("--end_id", type=int, help="结束报告ID")
     parser.add_argument("--max_files", type=int, help="最大处理文件数量")
     parser.add_argument("--mock_mode", action="store_true", help="启用模拟模式")
+    parser.add_argument("--batch", action="store_true", help="使用Batch API离线批处理（费用更低，需等待任务完成）")
     parser.add_argument("--config", default="config/config.yaml", help="配置文件路径")
+    parser.add_argument("--verbose", action="store_true", help="在控制台输出逐症状的处理进度")
+    parser.add_argument("--cache", action="store_true", help="复用API响应缓存中相同症状文本的回答（结果中标记 cached）")
     
     args = parser.parse_args()
     
     # 创建并运行工作流程
-    workflow = MainWorkflow(args.config)
-    workflow.run_workflow(
-        start_id=args.start_id,
-        end_id=args.end_id,
-        max_files=args.max_files,
-        mock_mode=args.mock_mode
-    )
+    workflow = MainWorkflow(args.config, verbose=args.verbose, use_cache=args.cache)
+    if args.batch and not args.mock_mode:
+        workflow.run_workflow_batched(
+            start_id=args.start_id,
+            end_id=args.end_id,
+            max_files=args.max_files
+        )
+    else:
+        workflow.run_workflow(
+            start_id=args.start_id,
+            end_id=args.end_id,
+            max_files=args.max_files,
+            mock_mode=args.mock_mode
+        )
 
 
 if __name__ == "__main__":
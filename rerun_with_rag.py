@@ -13,13 +13,16 @@
 import os
 import sys
 import json
+import asyncio
 import argparse
 import logging
-import shutil
+import fnmatch
+from sys import intern
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any
+from collections.abc import Hashable
+from typing import Dict, List, Any, Collection, Iterable, Iterator, Optional, Tuple
 from pathlib import Path
-import glob
 
 # --- 关键：确保脚本能找到src目录下的模块 ---
 # 将项目根目录添加到Python路径中
@@ -30,25 +33,373 @@ try:
     from api_manager import APIManager
     from evaluator import Evaluator
     from utils.logger import ReportLogger
+    from utils.json_io import read_json, write_json, loads
+    from utils.response_cache import ResponseCache
 except ImportError as e:
     print("错误: 无法导入必要的模块。请确保此脚本位于项目根目录，并且'src'文件夹存在。")
     print(f"详细错误: {e}")
     sys.exit(1)
 
 
+# 对比的各项指标: (指标键, 改善差值键, 改善描述模板)
+_METRIC_IMPROVEMENTS = (
+    ('precision', 'precision_improvement', "精确率提升 {:.1f}%"),
+    ('recall', 'recall_improvement', "召回率提升 {:.1f}%"),
+    ('f1_score', 'f1_improvement', "F1分数提升 {:.1f}%"),
+    ('overall_score', 'overall_improvement', "综合得分提升 {:.1f}分"),
+)
+
+# 评测摘要中各API改善分析的键名后缀: f"{api_name}_improvement"
+_IMPROVEMENT_SUFFIX = '_improvement'
+
+
+# 分数报告中单个(症状, API)的详细分析段落，整段一次格式化
+_SCORE_DETAIL_TEMPLATE = (
+    "\n  [{api_name}]\n"
+    "    精确率改善: {precision_improvement:+6.1f}%\n"
+    "    召回率改善: {recall_improvement:+6.1f}%\n"
+    "    F1分数改善: {f1_improvement:+6.1f}%\n"
+    "    综合得分改善: {overall_improvement:+6.1f}分\n"
+    "    器官识别改善: {organ}\n"
+    "    位置信息变化: {locations}\n"
+    "    总体评估: {assessment}\n"
+)
+
+# 分数报告"平均指标改善"表格的一行: API、精确率、召回率、F1分数、综合得分
+_SCORE_AVERAGE_ROW_TEMPLATE = "{:<12} {:+6.1f}%   {:+6.1f}%   {:+6.1f}%   {:+6.1f}分\n"
+
+# RAG增强Prompt模板，固定的说明文字只在模块加载时构建一次
+_AUGMENTED_PROMPT_TEMPLATE = (
+    "以下是我的症状描述：\n"
+    "{query}\n"
+    "\n"
+    "下面给你一些来自检索系统（RAG）的相关参考，请在回答时以这些参考为主要依据进行推理与归纳，同时严格输出JSON结构：\n"
+    "--- 参考资料 ---\n"
+    "{references}\n"
+    "--- 请根据以上信息回答 ---"
+)
+
+
+def _intern_str(value):
+    """字符串驻留：器官名、解剖位置在各症状、各API间大量重复，驻留后共享同一对象"""
+    return intern(value) if type(value) is str else value
+
+
+def _collect_expected(expected_results: Optional[List[Dict[str, Any]]]) -> Tuple[set, set]:
+    """一遍遍历期望结果，返回去重后的 (器官名集合, 解剖位置集合)，忽略非字典项"""
+    expected_organs = set()
+    expected_locations = set()
+    for expected_result in expected_results or ():
+        if isinstance(expected_result, dict):
+            organ_name = expected_result.get('organName', '')
+            if organ_name:
+                expected_organs.add(_intern_str(organ_name))
+            expected_locations.update(map(_intern_str, expected_result.get('anatomicalLocations', [])))
+    return expected_organs, expected_locations
+
+
+def _slim_baseline_response(response: Any) -> Any:
+    """对比只用到baseline响应的器官名与解剖位置，只保留这两项（字符串驻留），原始响应文本等随之释放"""
+    if not isinstance(response, dict):
+        return response
+    slim = {}
+    if 'organ_name' in response:
+        slim['organ_name'] = _intern_str(response['organ_name'])
+    if 'anatomical_locations' in response:
+        locations = response['anatomical_locations']
+        slim['anatomical_locations'] = [_intern_str(loc) for loc in locations] if type(locations) is list else locations
+    return slim
+
+
+class _ApiScoreStats:
+    """分数报告中单个API的累计统计，使用 __slots__ 固定字段布局"""
+    
+    __slots__ = ('sum_precision', 'sum_recall', 'sum_f1', 'sum_overall', 'n', 'effect_counts', 'organ_improvements')
+    
+    def __init__(self):
+        self.sum_precision = 0
+        self.sum_recall = 0
+        self.sum_f1 = 0
+        self.sum_overall = 0
+        self.n = 0
+        # 按综合得分改善的符号索引: [0] 无变化, [1] 改善, [-1] 负面
+        self.effect_counts = [0, 0, 0]
+        self.organ_improvements = 0
+    
+    @property
+    def positive_effects(self) -> int:
+        return self.effect_counts[1]
+    
+    @property
+    def negative_effects(self) -> int:
+        return self.effect_counts[-1]
+    
+    @property
+    def no_effects(self) -> int:
+        return self.effect_counts[0]
+    
+    @property
+    def avg_precision(self) -> float:
+        return self.sum_precision / self.n if self.n else 0.0
+    
+    @property
+    def avg_recall(self) -> float:
+        return self.sum_recall / self.n if self.n else 0.0
+    
+    @property
+    def avg_f1(self) -> float:
+        return self.sum_f1 / self.n if self.n else 0.0
+    
+    @property
+    def avg_overall(self) -> float:
+        return self.sum_overall / self.n if self.n else 0.0
+
+
+def _format_rag_unit(u_unit: Dict[str, Any]) -> str:
+    """将一个RAG检索单元格式化为一行参考资料"""
+    text = u_unit.get('d_diagnosis', '')
+    organ = u_unit.get('o_organ', {})
+    if organ and isinstance(organ, dict):
+        loc_str = ", ".join(organ.get('anatomicalLocations', []))
+        return f"- {text} | organ: {organ.get('organName', '')} | locations: {loc_str}".strip()
+    return f"- {text}".strip()
+
+
+# 目录扫描缓存: (目录, 匹配模式, 排除子串) -> (目录mtime, 目录内文件名集合, 最新文件路径)；
+# mtime 的精度可能不足以区分同一时刻新增的文件，因此同时比较文件名集合，任一变化即重新扫描
+_latest_file_cache: Dict[Tuple[str, Tuple[str, ...], Tuple[str, ...]], Tuple[int, frozenset, Optional[str]]] = {}
+
+
+def _find_latest_file(directory: Path, patterns: Tuple[str, ...], exclude: Tuple[str, ...] = ()) -> Optional[str]:
+    """在目录中查找匹配任一模式、且文件名不含 exclude 中子串的最新创建的文件，没有时返回None
+
+    目录只列举一次，文件名未变化时直接使用缓存结果；需要重新比较时每个候选文件只 stat 一次
+    """
+    directory = str(directory)
+    try:
+        dir_mtime = os.stat(directory).st_mtime_ns
+        names = frozenset(os.listdir(directory))
+    except OSError:
+        return None
+    
+    cache_key = (directory, patterns, exclude)
+    cached = _latest_file_cache.get(cache_key)
+    if cached is not None and cached[0] == dir_mtime and cached[1] == names:
+        return cached[2]
+    
+    latest = None
+    for name in names:
+        if not any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns):
+            continue
+        if any(word in name for word in exclude):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            candidate = (os.stat(path).st_ctime, path)
+        except OSError:
+            continue
+        if latest is None or candidate > latest:
+            latest = candidate
+    
+    latest_path = latest[1] if latest else None
+    _latest_file_cache[cache_key] = (dir_mtime, names, latest_path)
+    return latest_path
+
+
+def _write_score_report(report_id: int, simplified_results: Dict[str, Any], result_folder: Path, timestamp: str,
+                        emit_details: bool = True) -> Path:
+    """根据评测摘要生成RAG效果分数报告 (TXT格式)，返回报告路径"""
+    report_path = result_folder / f"report_{report_id}_rag_score_report.txt"
+    
+    # 收集所有API名称（各症状的API集合可能不同，需遍历全部症状；去掉后缀用切片）
+    api_names = sorted({
+        key[:-len(_IMPROVEMENT_SUFFIX)]
+        for symptom_data in simplified_results['symptoms'].values()
+        for key in symptom_data
+        if key.endswith(_IMPROVEMENT_SUFFIX)
+    })
+    # 只依赖API名称的键名与显示名在循环外预先算好
+    improvement_keys = {api_name: f"{api_name}_improvement" for api_name in api_names}
+    api_upper = {api_name: api_name.upper() for api_name in api_names}
+    
+    # 准备统计数据：各项改善只累加总和与计数，不保存逐症状列表
+    api_stats = {api_name: _ApiScoreStats() for api_name in api_names}
+    
+    # 收集每个症状的数据；不输出详细分析时只做统计，不保存逐症状详情
+    symptom_details = []
+    for symptom_name, symptom_data in simplified_results['symptoms'].items():
+        symptom_info = {
+            'name': symptom_name,
+            'apis': {}
+        }
+        
+        for api_name in api_names:
+            improvement = symptom_data.get(improvement_keys[api_name])
+            if improvement is None:
+                continue
+            
+            # 收集统计数据（get 方法绑定到局部变量，每个格子的多次读取不再重复属性查找）
+            improvement_get = improvement.get
+            metrics_get = improvement_get('metrics_improvement', {}).get
+            precision_imp = metrics_get('precision_improvement', 0)
+            recall_imp = metrics_get('recall_improvement', 0)
+            f1_imp = metrics_get('f1_improvement', 0)
+            overall_imp = metrics_get('overall_improvement', 0)
+            organ_improved = improvement_get('organ_improved', False)
+            
+            # 每个(症状, API)格子只查一次该API的统计字典
+            stats = api_stats[api_name]
+            stats.sum_precision += precision_imp
+            stats.sum_recall += recall_imp
+            stats.sum_f1 += f1_imp
+            stats.sum_overall += overall_imp
+            stats.n += 1
+            
+            # 分类效果与器官改善在同一遍中无分支累加：按综合得分改善的符号(+1/0/-1)定位计数，器官改善按布尔值计数
+            stats.effect_counts[(overall_imp > 0) - (overall_imp < 0)] += 1
+            stats.organ_improvements += bool(organ_improved)
+            
+            # 保存症状详情
+            if emit_details:
+                symptom_info['apis'][api_name] = {
+                    'precision_improvement': precision_imp,
+                    'recall_improvement': recall_imp,
+                    'f1_improvement': f1_imp,
+                    'overall_improvement': overall_imp,
+                    'assessment': improvement_get('assessment', ''),
+                    'organ_improved': organ_improved,
+                    'locations_changed': improvement_get('locations_changed', False)
+                }
+        
+        symptom_details.append(symptom_info)
+    
+    # 生成报告：先在内存中拼接全部文本，最后一次性写入文件
+    report_lines = []
+    w = report_lines.append
+    w("=" * 80 + "\n")
+    w(f"RAG 效果分析报告 - Report {report_id}\n")
+    w("=" * 80 + "\n")
+    w(f"生成时间: {timestamp}\n")
+    w(f"总症状数: {len(symptom_details)}\n")
+    w(f"评测APIs: {', '.join(api_names)}\n")
+    w("\n")
+    
+    # 1. 总体效果概览
+    w("█ 总体效果概览\n")
+    w("-" * 60 + "\n")
+    for api_name in api_names:
+        stats = api_stats[api_name]
+        total_symptoms = stats.n
+        w(f"\n【{api_upper[api_name]}】\n")
+        w(f"  ✅ 改善症状: {stats.positive_effects}/{total_symptoms} ({stats.positive_effects/total_symptoms*100:.1f}%)\n")
+        w(f"  ❌ 负面影响: {stats.negative_effects}/{total_symptoms} ({stats.negative_effects/total_symptoms*100:.1f}%)\n")
+        w(f"  ⚪ 无明显变化: {stats.no_effects}/{total_symptoms} ({stats.no_effects/total_symptoms*100:.1f}%)\n")
+        w(f"  🎯 器官识别改善: {stats.organ_improvements}/{total_symptoms} ({stats.organ_improvements/total_symptoms*100:.1f}%)\n")
+    w("\n")
+    
+    # 2. 平均指标改善
+    w("█ 平均指标改善\n")
+    w("-" * 60 + "\n")
+    w(f"{'API':<12} {'精确率':<10} {'召回率':<10} {'F1分数':<10} {'综合得分':<10}\n")
+    w("-" * 60 + "\n")
+    w("".join(
+        _SCORE_AVERAGE_ROW_TEMPLATE.format(api_name, stats.avg_precision, stats.avg_recall, stats.avg_f1, stats.avg_overall)
+        for api_name, stats in api_stats.items()  # api_stats 按 api_names 顺序构建
+    ))
+    w("\n")
+    
+    # 3. 各症状详细分析
+    if emit_details:
+        w("█ 各症状详细分析\n")
+        w("-" * 80 + "\n")
+        for i, symptom_info in enumerate(symptom_details, 1):
+            w(f"\n{i}. 【{symptom_info['name']}】\n")
+            w("-" * 40 + "\n")
+            
+            for api_name in api_names:
+                api_data = symptom_info['apis'].get(api_name)
+                if api_data is None:
+                    continue
+                w(_SCORE_DETAIL_TEMPLATE.format(
+                    api_name=api_upper[api_name],
+                    organ='是' if api_data['organ_improved'] else '否',
+                    locations='是' if api_data['locations_changed'] else '否',
+                    **api_data
+                ))
+            w("\n")
+    
+    # 4. 结论与建议
+    w("█ 结论与建议\n")
+    w("-" * 60 + "\n")
+    
+    # 找出表现最好和最差的API
+    # 一次遍历同时求最大/最小平均综合得分改善，并列时取排序靠前的API（与 max/min 一致）
+    best_api = worst_api = api_names[0]
+    best_overall = worst_overall = api_stats[best_api].avg_overall
+    for api_name in api_names[1:]:
+        avg_overall = api_stats[api_name].avg_overall
+        if avg_overall > best_overall:
+            best_api, best_overall = api_name, avg_overall
+        if avg_overall < worst_overall:
+            worst_api, worst_overall = api_name, avg_overall
+    
+    w(f"\n【最佳表现API】: {api_upper[best_api]}\n")
+    w(f"  平均综合得分改善: {api_stats[best_api].avg_overall:+.1f}分\n")
+    w(f"  改善症状比例: {api_stats[best_api].positive_effects/api_stats[best_api].n*100:.1f}%\n")
+    
+    w(f"\n【需要改进API】: {api_upper[worst_api]}\n")
+    w(f"  平均综合得分改善: {api_stats[worst_api].avg_overall:+.1f}分\n")
+    w(f"  负面影响症状比例: {api_stats[worst_api].negative_effects/api_stats[worst_api].n*100:.1f}%\n")
+    
+    # 总体RAG效果评估
+    total_positive = sum(stats.positive_effects for stats in api_stats.values())
+    total_negative = sum(stats.negative_effects for stats in api_stats.values())
+    total_evaluations = sum(stats.n for stats in api_stats.values())
+    
+    w(f"\n【总体RAG效果】:\n")
+    w(f"  积极影响: {total_positive}/{total_evaluations} ({total_positive/total_evaluations*100:.1f}%)\n")
+    w(f"  负面影响: {total_negative}/{total_evaluations} ({total_negative/total_evaluations*100:.1f}%)\n")
+    
+    if total_positive > total_negative:
+        w(f"  🎯 结论: RAG增强总体上**有效**，建议继续使用和优化\n")
+    elif total_positive < total_negative:
+        w(f"  ⚠️  结论: RAG增强存在问题，建议检查检索质量和增强策略\n")
+    else:
+        w(f"  ⚪ 结论: RAG增强效果不明显，建议优化检索模型和增强方法\n")
+    
+    w("\n" + "=" * 80 + "\n")
+    
+    report_path.write_text(''.join(report_lines), encoding='utf-8')
+    
+    return report_path
+
+
 class RerunWorkflow:
     """使用已有RAG结果重新运行LLM的工作流"""
 
-    def __init__(self, report_id: int, config_path: str = "config/config.yaml"):
+    def __init__(self, report_id: int, config_path: str = "config/config.yaml", emit_details: bool = True,
+                 use_cache: bool = False):
         self.report_id = report_id
+        # 本报告所有输出文件名的公共前缀，只拼接一次
+        self._file_prefix = f"report_{report_id}_"
+        # 分数报告是否包含"各症状详细分析"部分（症状多时该部分占报告的绝大部分）
+        self.emit_details = emit_details
         self.config = ConfigLoader(config_path)
         self.api_manager = APIManager()
         self.evaluator = Evaluator()
         self.logger = ReportLogger()
+        
+        # 同时进行的症状API请求数量上限
+        self.max_concurrency = self.config.config.get('evaluation', {}).get('max_concurrency', 10)
+        
+        # 系统提示词在baseline与RAG增强两个阶段中相同，只读取一次
+        self._system_prompt = self._load_system_prompt()
 
         # --- 路径定义 ---
         # RAG缓存文件的存放位置
         self.rag_output_dir = Path("/home/duojiechen/Projects/Rag_system/Rag_Evaluate/final_result/rag_search_output")
+        # 原始测试数据的位置（生成baseline时使用）
+        self.test_data_path = Path("/home/duojiechen/Projects/Central_Data/RAG_System/test_set")
         
         # 统一在final_result下管理所有结果
         self.final_result_dir = Path("final_result")
@@ -58,7 +409,13 @@ class RerunWorkflow:
         
         # 创建所有必要的目录
         for dir_path in [self.baseline_results_dir, self.rerun_results_dir, self.comparison_results_dir]:
-            dir_path.mkdir(parents=True, exist_ok=True)
+            os.makedirs(dir_path, exist_ok=True)
+        
+        # LLM响应缓存：(API, 模型, 系统提示词, 增强Prompt) 原文完全相同的请求在重复运行时直接复用已保存的响应；
+        # 增强Prompt包含检索内容，按原文精确匹配，不做大小写/空白规范化。
+        # 默认关闭：模型以非零温度采样，缓存的回答不等同于重新调用；命中缓存的响应带有 'cached': True 标记
+        if use_cache:
+            self.api_manager.response_cache = ResponseCache(self.final_result_dir / "llm_cache", normalize=False)
         
         print(f"🎯 报告ID: {self.report_id}")
         print(f"🔍 RAG缓存目录: {self.rag_output_dir}")
@@ -66,45 +423,55 @@ class RerunWorkflow:
         print(f"💾 RAG增强结果目录: {self.rerun_results_dir}")
         print(f"📊 对比结果目录: {self.comparison_results_dir}")
 
+    def _load_system_prompt(self) -> str:
+        """读取系统提示词，文件不存在时使用默认提示词"""
+        system_prompt_path = Path("prompt/system_prompt.txt")
+        if system_prompt_path.exists():
+            return system_prompt_path.read_text(encoding='utf-8').strip()
+        return "你是一个医学专家，请根据症状识别相关的器官和解剖位置。"
+
     def find_latest_rag_cache(self) -> Path:
         """根据报告ID查找最新的RAG结果文件 (.jsonl)"""
-        search_pattern = f"report_{self.report_id}_ragoutcome:*.jsonl"
-        files = glob.glob(str(self.rag_output_dir / search_pattern))
+        search_pattern = f"{self._file_prefix}ragoutcome:*.jsonl"
+        latest_file = _find_latest_file(self.rag_output_dir, (search_pattern,))
         
-        if not files:
+        if not latest_file:
             raise FileNotFoundError(f"在目录 {self.rag_output_dir} 中未找到报告ID {self.report_id} 的RAG缓存文件。")
         
-        latest_file = max(files, key=os.path.getctime)
         print(f"🔍 找到最新的RAG缓存文件: {Path(latest_file).name}")
         return Path(latest_file)
 
     def find_or_create_baseline_results(self) -> Path:
         """查找或创建对应的baseline结果文件"""
-        # 先在统一的baseline_results目录中查找
-        search_pattern = f"report_diagnostic_{self.report_id}_evaluation_*.json"
-        files = glob.glob(str(self.baseline_results_dir / search_pattern))
+        baseline_file = self._find_existing_baseline()
+        if baseline_file:
+            return baseline_file
         
+        # 如果都没有找到，自动运行baseline评估
+        print(f"🚨 未找到报告ID {self.report_id} 的baseline结果，正在自动生成...")
+        return self._run_baseline_evaluation()
+
+    def _find_existing_baseline(self) -> Optional[Path]:
+        """查找已有的baseline结果文件，没有时返回None"""
+        # 先在统一的baseline_results目录中查找
+        # main_workflow 的详细结果以 .json.gz 保存，旧结果为 .json
+        search_patterns = (f"report_diagnostic_{self.report_id}_evaluation_*.json",
+                           f"report_diagnostic_{self.report_id}_evaluation_*.json.gz")
         # 过滤掉标准化版本和用户格式版本
-        detailed_files = [f for f in files if 'standardized' not in f and 'user_format' not in f]
+        exclude = ('standardized', 'user_format')
         
-        if detailed_files:
-            latest_file = max(detailed_files, key=os.path.getctime)
+        latest_file = _find_latest_file(self.baseline_results_dir, search_patterns, exclude)
+        if latest_file:
             print(f"📋 找到已有baseline结果: {Path(latest_file).name}")
             return Path(latest_file)
         
         # 如果没有找到，尝试在旧的results目录查找
-        old_results_dir = Path("results")
-        old_files = glob.glob(str(old_results_dir / search_pattern))
-        old_detailed_files = [f for f in old_files if 'standardized' not in f and 'user_format' not in f]
-        
-        if old_detailed_files:
-            latest_file = max(old_detailed_files, key=os.path.getctime)
+        latest_file = _find_latest_file(Path("results"), search_patterns, exclude)
+        if latest_file:
             print(f"📋 找到旧的baseline结果: {Path(latest_file).name}")
             return Path(latest_file)
         
-        # 如果都没有找到，自动运行baseline评估
-        print(f"🚨 未找到报告ID {self.report_id} 的baseline结果，正在自动生成...")
-        return self._run_baseline_evaluation()
+        return None
 
     def _run_baseline_evaluation(self) -> Path:
         """运行baseline评估并返回结果文件路径"""
@@ -115,8 +482,7 @@ class RerunWorkflow:
         data_loader = DataLoader()
         
         # 寻找测试文件
-        test_data_path = Path("/home/duojiechen/Projects/Central_Data/RAG_System/test_set")
-        test_file = test_data_path / f"diagnostic_{self.report_id}.json"
+        test_file = self.test_data_path / f"diagnostic_{self.report_id}.json"
         
         if not test_file.exists():
             raise FileNotFoundError(f"测试文件不存在: {test_file}")
@@ -150,80 +516,80 @@ class RerunWorkflow:
             'symptoms': []
         }
         
-        # 加载系统提示词
-        system_prompt_path = Path("prompt/system_prompt.txt")
-        if system_prompt_path.exists():
-            with open(system_prompt_path, 'r', encoding='utf-8') as f:
-                system_prompt = f.read().strip()
-        else:
-            system_prompt = "你是一个医学专家，请根据症状识别相关的器官和解剖位置。"
+        # 各症状互不依赖，并发调用API并评估，结果保持原顺序
+        report_results['symptoms'] = asyncio.run(self._gather_in_threads(
+            self._process_baseline_symptom,
+            [(i, len(symptoms), symptom_item) for i, symptom_item in enumerate(symptoms, 1)]
+        ))
         
-        # 处理每个症状
-        for i, symptom_item in enumerate(symptoms, 1):
-            symptom_id = symptom_item.get('symptom_id', 'unknown')
-            symptom_text = symptom_item.get('symptom_text', '')
-            
-            print(f"  🔄 处理症状 {i}/{len(symptoms)}: {symptom_text[:50]}...")
+        return report_results
+
+    def _process_baseline_symptom(self, i: int, total: int, symptom_item: Dict[str, Any]) -> Dict[str, Any]:
+        """调用所有API处理单个baseline症状并评估，出错时返回带 error 的症状记录"""
+        symptom_id = symptom_item.get('symptom_id', 'unknown')
+        symptom_text = symptom_item.get('symptom_text', '')
+        
+        print(f"  🔄 处理症状 {i}/{total}: {symptom_text[:50]}...")
+        
+        # 提取期望的器官信息
+        expected_organs = symptom_item.get('expected_results', [])
+        
+        try:
+            # 调用API处理症状（baseline，不使用RAG）
+            api_result = self.api_manager.process_symptom(symptom_item, self._system_prompt)
             
-            # 提取期望的器官信息
-            expected_organs = symptom_item.get('expected_results', [])
+            # 构建症状数据结构
+            symptom_data = {
+                'symptom_id': symptom_id,
+                'diagnosis': symptom_text,
+                'expected_organs': expected_organs,
+                'api_responses': {}
+            }
             
-            try:
-                # 调用API处理症状（baseline，不使用RAG）
-                api_result = self.api_manager.process_symptom(symptom_item, system_prompt)
-                
-                # 构建症状数据结构
-                symptom_data = {
-                    'symptom_id': symptom_id,
-                    'diagnosis': symptom_text,
-                    'expected_organs': expected_organs,
-                    'api_responses': {}
+            # 处理每个API的响应和评估
+            for api_name, response in api_result.items():
+                api_response_data = {
+                    'response': response.get('response', ''),
+                    'parsed_data': response.get('parsed_data', {}),
+                    'organ_name': response.get('organ_name', ''),
+                    'anatomical_locations': response.get('anatomical_locations', [])
                 }
+                if response.get('cached'):
+                    api_response_data['cached'] = True
                 
-                # 处理每个API的响应和评估
-                for api_name, response in api_result.items():
-                    api_response_data = {
-                        'response': response.get('response', ''),
-                        'parsed_data': response.get('parsed_data', {}),
-                        'organ_name': response.get('organ_name', ''),
-                        'anatomical_locations': response.get('anatomical_locations', [])
+                # 评估这个API的响应
+                if response.get('success') and response.get('parsed_data'):
+                    evaluation = self.evaluator.evaluate_single_response(
+                        api_response=response,
+                        expected_results=expected_organs
+                    )
+                    api_response_data['evaluation'] = evaluation
+                else:
+                    api_response_data['evaluation'] = {
+                        'overall_score': 0.0,
+                        'precision': 0.0,
+                        'recall': 0.0,
+                        'overgeneration_penalty': 0.0,
+                        'detailed_analysis': 'API调用失败或无有效数据'
                     }
-                    
-                    # 评估这个API的响应
-                    if response.get('success') and response.get('parsed_data'):
-                        evaluation = self.evaluator.evaluate_single_response(
-                            api_response=response,
-                            expected_results=expected_organs
-                        )
-                        api_response_data['evaluation'] = evaluation
-                    else:
-                        api_response_data['evaluation'] = {
-                            'overall_score': 0.0,
-                            'precision': 0.0,
-                            'recall': 0.0,
-                            'overgeneration_penalty': 0.0,
-                            'detailed_analysis': 'API调用失败或无有效数据'
-                        }
-                    
-                    symptom_data['api_responses'][api_name] = api_response_data
-                
-                report_results['symptoms'].append(symptom_data)
                 
-            except Exception as e:
-                error_msg = f"处理症状 {symptom_id} 时出错: {str(e)}"
-                print(f"    ❌ {error_msg}")
-                
-                # 即使出错也要保存症状的基本信息
-                symptom_data = {
-                    'symptom_id': symptom_id,
-                    'diagnosis': symptom_text,
-                    'expected_organs': expected_organs,
-                    'error': str(e),
-                    'api_responses': {}
-                }
-                report_results['symptoms'].append(symptom_data)
-        
-        return report_results
+                symptom_data['api_responses'][api_name] = api_response_data
+            
+            return symptom_data
+            
+        except Exception as e:
+            error_msg = f"处理症状 {symptom_id} 时出错: {str(e)}"
+            print(f"    ❌ {error_msg}")
+            
+            # 即使出错也要保存症状的基本信息
+            symptom_data = {
+                'symptom_id': symptom_id,
+                'diagnosis': symptom_text,
+                'expected_organs': expected_organs,
+                'error': str(e),
+                'api_responses': {}
+            }
+            return symptom_data
 
     def _save_baseline_results(self, report_results: Dict[str, Any]) -> Path:
         """保存baseline结果到统一目录"""
@@ -234,8 +600,7 @@ class RerunWorkflow:
         detailed_filename = f"report_diagnostic_{report_id}_evaluation_{timestamp}.json"
         detailed_path = self.baseline_results_dir / detailed_filename
         
-        with open(detailed_path, 'w', encoding='utf-8') as f:
-            json.dump(report_results, f, ensure_ascii=False, indent=2)
+        write_json(report_results, detailed_path)
         
         print(f"💾 Baseline结果已保存: {detailed_path}")
         return detailed_path
@@ -245,198 +610,223 @@ class RerunWorkflow:
         根据RAG结果构建增强型Prompt。
         此逻辑与comparision_workflow.py保持一致。
         """
-        primary_refs = []
         if not rag_results:
             return original_query
 
-        # 遍历rag_s_1_id, rag_s_2_id等
-        for key, value in rag_results.items():
-            if isinstance(value, dict) and 'units' in value:
-                for unit in value.get('units', []):
-                    u_unit = unit.get('u_unit', {})
-                    text = u_unit.get('d_diagnosis', '')
-                    organ = u_unit.get('o_organ', {})
-                    primary_refs.append({'text': text, 'organ': organ})
+        # 遍历rag_s_1_id, rag_s_2_id等，每个检索单元直接格式化为一行参考
+        primary_block = "\n".join(
+            _format_rag_unit(unit.get('u_unit', {}))
+            for value in rag_results.values() if isinstance(value, dict) and 'units' in value
+            for unit in value['units']
+        )
 
-        if not primary_refs:
+        if not primary_block:
             return original_query
+        
+        return _AUGMENTED_PROMPT_TEMPLATE.format(query=original_query.strip(), references=primary_block)
 
-        def fmt_ref(ref: Dict[str, Any]) -> str:
-            organ_part = ""
-            organ = ref.get('organ')
-            if organ and isinstance(organ, dict):
-                name = organ.get('organName', '')
-                locs = organ.get('anatomicalLocations', [])
-                loc_str = ", ".join(locs)
-                organ_part = f" | organ: {name} | locations: {loc_str}"
-            text = ref.get('text', '')
-            return f"- {text}{organ_part}".strip()
-
-        primary_block = "\n".join([fmt_ref(r) for r in primary_refs])
-        
-        # --- Prompt模板 ---
-        aug_parts = [
-            "以下是我的症状描述：",
-            original_query.strip(),
-            "",
-            "下面给你一些来自检索系统（RAG）的相关参考，请在回答时以这些参考为主要依据进行推理与归纳，同时严格输出JSON结构：",
-            "--- 参考资料 ---",
-            primary_block if primary_block else "(无)",
-            "--- 请根据以上信息回答 ---",
-        ]
-        return "\n".join(aug_parts)
-
-    def run(self):
-        """执行完整的工作流程"""
+    def run(self) -> bool:
+        """执行完整的工作流程，返回是否成功产出RAG增强结果"""
         try:
             # 1. 初始化API管理器
             print("\n🔧 初始化API连接...")
             if not self.api_manager.initialize_clients(self.config.config):
                 print("❌ API客户端初始化失败，请检查配置")
-                return
+                return False
             
             # 2. 查找RAG缓存文件
             rag_cache_file = self.find_latest_rag_cache()
             
-            # 3. 查找或创建baseline结果
-            baseline_file = self.find_or_create_baseline_results()
+            # 3. 查找baseline结果；需要重新生成时放到后台线程，与RAG增强处理同时进行
+            with ThreadPoolExecutor(max_workers=1) as baseline_executor:
+                baseline_file = self._find_existing_baseline()
+                baseline_future = None
+                if not baseline_file:
+                    print(f"🚨 未找到报告ID {self.report_id} 的baseline结果，正在自动生成...")
+                    baseline_future = baseline_executor.submit(self._run_baseline_evaluation)
+                
+                # 4. 处理RAG缓存文件
+                all_rag_results = {}
+                all_comparisons = {}
+                
+                print(f"\n🚀 开始处理RAG缓存文件...")
+                
+                # 边解析边提交：每解析出一行就交给线程池调用API，无需等整个文件解析完；结果按行号顺序汇总
+                outcomes = asyncio.run(self._gather_in_threads(
+                    self._process_rag_item,
+                    self._iter_rag_records(rag_cache_file)
+                ))
+                for outcome in outcomes:
+                    if outcome is not None:
+                        original_query, rag_result = outcome
+                        all_rag_results[original_query] = rag_result
+                
+                # 等待baseline生成完成（失败时抛出异常）
+                if baseline_future is not None:
+                    baseline_file = baseline_future.result()
+            
             baseline_data = {}
             if baseline_file:
-                with open(baseline_file, 'r', encoding='utf-8') as f:
-                    baseline_results = json.load(f)
-                    # 将baseline结果按症状文本索引，同时保存期望结果
-                    for symptom in baseline_results.get('symptoms', []):
-                        diagnosis = symptom.get('diagnosis', '')
-                        baseline_data[diagnosis] = {
-                            'api_responses': symptom.get('api_responses', {}),
-                            'expected_organs': symptom.get('expected_organs', [])
-                        }
-            
-            # 4. 处理RAG缓存文件
-            all_rag_results = {}
-            all_comparisons = {}
-            
-            print(f"\n🚀 开始处理RAG缓存文件...")
-            
-            # 加载系统提示词
-            system_prompt_path = Path("prompt/system_prompt.txt")
-            system_prompt = system_prompt_path.read_text(encoding='utf-8') if system_prompt_path.exists() else "你是一个医学专家，请根据症状识别相关的器官和解剖位置。"
+                # read_json 在安装了 orjson 时由其C实现解析
+                baseline_results = read_json(baseline_file)
+                # 将baseline结果按症状文本索引，同时保存期望结果；各API响应只保留对比所需字段
+                baseline_data = {
+                    symptom.get('diagnosis', ''): {
+                        'api_responses': {
+                            api_name: _slim_baseline_response(response)
+                            for api_name, response in symptom.get('api_responses', {}).items()
+                        },
+                        'expected_organs': symptom.get('expected_organs', [])
+                    }
+                    for symptom in baseline_results.get('symptoms', [])
+                }
+                del baseline_results
             
-            with open(rag_cache_file, 'r', encoding='utf-8') as f:
-                for i, line in enumerate(f):
-                    try:
-                        data = json.loads(line)
-                        original_query = data.get("query", "").strip()
-                        rag_s_block = data.get("s", {})
-                        
-                        if not original_query:
-                            print(f"⚠️  第 {i+1} 行缺少 'query' 字段，跳过。")
-                            continue
-                            
-                        print(f"\n--- 正在处理症状 {i+1}: {original_query[:50]}... ---")
-                        
-                        # 构建增强型Prompt
-                        augmented_prompt = self._build_augmented_prompt(original_query, rag_s_block)
-                        
-                        # 调用所有API进行处理
-                        symptom_item_for_api = {
-                            'symptom_id': f'rerun_{self.report_id}_{i}',
-                            'symptom_text': augmented_prompt,
-                            'expected_results': []  # 可以从原始数据中提取
-                        }
-                        
-                        api_results = self.api_manager.process_symptom(symptom_item_for_api, system_prompt)
-                        
-                        # 为每个API结果添加评估（如果有期望结果）
-                        for api_name, response in api_results.items():
-                            if response.get('success') and response.get('parsed_data'):
-                                # 这里可以添加评估逻辑，但目前我们只关注API响应
-                                pass
-                        
-                        all_rag_results[original_query] = {
-                            'api_responses': api_results,
-                            'rag_context': rag_s_block,
-                            'augmented_prompt': augmented_prompt
-                        }
-                        
-                        # 如果有baseline数据，进行对比
-                        if original_query in baseline_data:
-                            baseline_info = baseline_data[original_query]
-                            baseline_api_responses = baseline_info['api_responses']
-                            expected_results = baseline_info['expected_organs']  # 使用baseline中的期望结果
-                            comparison = self._compare_responses(baseline_api_responses, api_results, expected_results)
-                            all_comparisons[original_query] = comparison
-                        
-                        print(f"✅ 完成症状处理: {original_query[:30]}...")
-                        
-                    except json.JSONDecodeError:
-                        print(f"⚠️  第 {i+1} 行不是有效的JSON格式，跳过。")
-                    except Exception as e:
-                        print(f"❌ 处理第 {i+1} 行时出错: {e}")
+            # 如果有baseline数据，与RAG增强结果进行对比
+            for original_query, rag_result in all_rag_results.items():
+                if original_query not in baseline_data:
+                    continue
+                baseline_info = baseline_data[original_query]
+                try:
+                    all_comparisons[original_query] = self._compare_responses(
+                        baseline_info['api_responses'],
+                        rag_result['api_responses'],
+                        baseline_info['expected_organs']  # 使用baseline中的期望结果
+                    )
+                except Exception as e:
+                    print(f"❌ 对比症状 {original_query[:30]}... 时出错: {e}")
                         
             # 5. 保存最终结果
             if all_rag_results:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                
-                # 保存RAG增强结果
-                rag_output_filename = self.rerun_results_dir / f"report_{self.report_id}_withRAG_{timestamp}.json"
-                with open(rag_output_filename, 'w', encoding='utf-8') as f:
-                    json.dump(all_rag_results, f, ensure_ascii=False, indent=2)
-                
-                print(f"\n✅ RAG增强结果已保存: {rag_output_filename}")
+                # 本次输出的文件名与评测摘要共用同一时刻
+                finished_at = datetime.now()
+                timestamp = finished_at.strftime("%Y%m%d_%H%M%S")
                 
-                # 保存对比结果（如果有）
-                if all_comparisons:
-                    comparison_filename = self.comparison_results_dir / f"report_{self.report_id}_comparison_{timestamp}.json"
-                    with open(comparison_filename, 'w', encoding='utf-8') as f:
-                        json.dump(all_comparisons, f, ensure_ascii=False, indent=2)
-                    
-                    print(f"✅ 对比结果已保存: {comparison_filename}")
-                    
-                    # 生成简化的评测结果文件
-                    simplified_filename = self.comparison_results_dir / f"report_{self.report_id}_evaluation_summary_{timestamp}.json"
-                    simplified_results = self._generate_evaluation_summary(all_comparisons, baseline_data)
-                    with open(simplified_filename, 'w', encoding='utf-8') as f:
-                        json.dump(simplified_results, f, ensure_ascii=False, indent=2)
+                # 各结果文件互不依赖，交给线程池并发写入；摘要与分数报告的生成和写入重叠
+                with ThreadPoolExecutor(max_workers=3) as write_executor:
+                    # 保存RAG增强结果
+                    rag_output_filename = self.rerun_results_dir / f"{self._file_prefix}withRAG_{timestamp}.json"
+                    write_futures = [(write_executor.submit(write_json, all_rag_results, rag_output_filename),
+                                      f"\n✅ RAG增强结果已保存: {rag_output_filename}")]
                     
-                    print(f"✅ 评测摘要已保存: {simplified_filename}")
-                    
-                    # 创建专门的结果文件夹并生成分数报告
-                    result_folder = self.comparison_results_dir / f"report_{self.report_id}_results_{timestamp}"
-                    result_folder.mkdir(exist_ok=True)
-                    
-                    # 移动evaluation_summary到新文件夹
-                    new_summary_path = result_folder / f"report_{self.report_id}_evaluation_summary.json"
-                    shutil.move(str(simplified_filename), str(new_summary_path))
-                    
-                    # 生成分数报告
-                    score_report_path = self._generate_score_report(simplified_results, result_folder, timestamp)
+                    # 保存对比结果（如果有）
+                    if all_comparisons:
+                        comparison_filename = self.comparison_results_dir / f"{self._file_prefix}comparison_{timestamp}.json"
+                        write_futures.append((write_executor.submit(write_json, all_comparisons, comparison_filename),
+                                              f"✅ 对比结果已保存: {comparison_filename}"))
+                        
+                        # 创建专门的结果文件夹，评测摘要直接写入其中
+                        result_folder = self.comparison_results_dir / f"{self._file_prefix}results_{timestamp}"
+                        result_folder.mkdir(exist_ok=True)
+                        
+                        # 生成简化的评测结果文件
+                        summary_path = result_folder / f"{self._file_prefix}evaluation_summary.json"
+                        simplified_results = self._generate_evaluation_summary(all_comparisons, baseline_data, finished_at)
+                        write_futures.append((write_executor.submit(write_json, simplified_results, summary_path),
+                                              f"✅ 评测摘要已保存: {summary_path}"))
+                        
+                        # 生成分数报告
+                        score_report_path = self._generate_score_report(simplified_results, result_folder, timestamp)
                     
+                    # 等待所有写入完成，写入失败时抛出异常
+                    for write_future, message in write_futures:
+                        write_future.result()
+                        print(message)
+                
+                if all_comparisons:
                     print(f"✅ 分数报告已保存: {score_report_path}")
                     print(f"📁 完整结果已保存到: {result_folder}")
                 
                 print("\n🎉 ===== 任务完成! =====")
                 print(f"📊 成功处理了 {len(all_rag_results)} 个症状")
+                if self.api_manager.response_cache is not None:
+                    print(f"💾 {self.api_manager.response_cache.stats_line()}")
                 print(f"\n📁 生成的文件:")
                 print(f"  📋 Baseline结果: {baseline_file}")
                 print(f"  💾 RAG增强结果: {rag_output_filename}")
                 if all_comparisons:
                     print(f"  📈 详细对比结果: {comparison_filename}")
                     print(f"  📂 完整结果文件夹: {result_folder}")
-                    print(f"    ├── 📝 评测摘要 (JSON): report_{self.report_id}_evaluation_summary.json")
-                    print(f"    └── 📊 分数报告 (TXT): report_{self.report_id}_rag_score_report.txt")
+                    print(f"    ├── 📝 评测摘要 (JSON): {self._file_prefix}evaluation_summary.json")
+                    print(f"    └── 📊 分数报告 (TXT): {self._file_prefix}rag_score_report.txt")
                     print(f"\n✨ 分数报告包含:")
                     print(f"     - 总体效果概览 (改善/负面/无变化比例)")
                     print(f"     - 平均指标改善 (精确率、召回率、F1分数、综合得分)")
-                    print(f"     - 各症状详细分析")
+                    if self.emit_details:
+                        print(f"     - 各症状详细分析")
                     print(f"     - 结论与建议 (最佳/最差API，总体RAG效果评估)")
+            
+            return bool(all_rag_results)
 
         except FileNotFoundError as e:
             print(f"\n❌ 错误: {e}")
             print("   请确保您已为该报告ID成功运行了RAG检索步骤。")
+            return False
         except Exception as e:
             print(f"\n❌ 工作流程执行时发生严重错误: {e}")
             logging.error(f"工作流程失败: {e}", exc_info=True)
+            return False
+
+    def _iter_rag_records(self, rag_cache_file: Path) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+        """逐行解析RAG缓存文件，依次产出 (行号, 原始症状, RAG检索块)，跳过无效行"""
+        # 以二进制逐行读取，文件不会整体载入内存；安装了 orjson 时每行由其C实现解析
+        with open(rag_cache_file, 'rb') as f:
+            for i, line in enumerate(f):
+                # 空行不是记录，直接跳过，不走解析失败的异常路径
+                if line.isspace():
+                    continue
+                try:
+                    data = loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️  第 {i+1} 行不是有效的JSON格式，跳过。")
+                    continue
+                
+                if not isinstance(data, dict):
+                    print(f"❌ 处理第 {i+1} 行时出错: 不是JSON对象")
+                    continue
+                
+                original_query = data.get("query", "").strip()
+                if not original_query:
+                    print(f"⚠️  第 {i+1} 行缺少 'query' 字段，跳过。")
+                    continue
+                
+                yield i, original_query, data.get("s", {})
+
+    async def _gather_in_threads(self, func, arg_tuples: Iterable[Tuple]) -> List[Any]:
+        """在线程池中并发执行 func(*args)，线程池大小即同时进行的API请求上限，结果保持输入顺序"""
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=max(self.max_concurrency, 1)) as executor:
+            return await asyncio.gather(*(loop.run_in_executor(executor, func, *args) for args in arg_tuples))
+
+    def _process_rag_item(self, i: int, original_query: str, rag_s_block: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """用增强型Prompt处理单个症状，返回 (原始症状, RAG增强结果)，出错返回None"""
+        try:
+            print(f"\n--- 正在处理症状 {i+1}: {original_query[:50]}... ---")
+            
+            # 构建增强型Prompt
+            augmented_prompt = self._build_augmented_prompt(original_query, rag_s_block)
+            
+            # 调用所有API进行处理
+            symptom_item_for_api = {
+                'symptom_id': f'rerun_{self.report_id}_{i}',
+                'symptom_text': augmented_prompt,
+                'expected_results': []  # 可以从原始数据中提取
+            }
+            
+            api_results = self.api_manager.process_symptom(symptom_item_for_api, self._system_prompt)
+            
+            rag_result = {
+                'api_responses': api_results,
+                'rag_context': rag_s_block,
+                'augmented_prompt': augmented_prompt
+            }
+            
+            print(f"✅ 完成症状处理: {original_query[:30]}...")
+            return original_query, rag_result
+            
+        except Exception as e:
+            print(f"❌ 处理第 {i+1} 行时出错: {e}")
+            return None
 
     def _compare_responses(self, baseline_responses: Dict[str, Any], rag_responses: Dict[str, Any], expected_results: List[Dict[str, Any]] = None) -> Dict[str, Any]:
         """对比baseline和RAG增强的API响应，包含详细的评估指标"""
@@ -445,17 +835,10 @@ class RerunWorkflow:
         # 找到共同的API
         common_apis = set(baseline_responses.keys()) & set(rag_responses.keys())
         
-        # 准备期望的解剖位置用于评估
-        expected_locations = []
-        expected_organs = []
-        if expected_results:
-            for expected_result in expected_results:
-                expected_locations.extend(expected_result.get('anatomicalLocations', []))
-                organ_name = expected_result.get('organName', '')
-                if organ_name:
-                    expected_organs.append(organ_name)
-        expected_locations = list(set(expected_locations))  # 去重
-        expected_organs = list(set(expected_organs))  # 去重
+        # 准备期望的解剖位置与器官用于评估，各API共用
+        expected_organs, expected_locations = _collect_expected(expected_results)
+        expected_locations = frozenset(expected_locations)
+        expected_organs = list(expected_organs)
         
         for api_name in common_apis:
             baseline_resp = baseline_responses.get(api_name, {})
@@ -477,10 +860,8 @@ class RerunWorkflow:
             
             # 计算改善情况
             metrics_improvement = {
-                'precision_improvement': rag_metrics['precision'] - baseline_metrics['precision'],
-                'recall_improvement': rag_metrics['recall'] - baseline_metrics['recall'],
-                'f1_improvement': rag_metrics['f1_score'] - baseline_metrics['f1_score'],
-                'overall_improvement': rag_metrics['overall_score'] - baseline_metrics['overall_score']
+                improvement_key: rag_metrics[metric_key] - baseline_metrics[metric_key]
+                for metric_key, improvement_key, _ in _METRIC_IMPROVEMENTS
             }
             
             comparison[api_name] = {
@@ -503,7 +884,7 @@ class RerunWorkflow:
                 'metrics_improvement': metrics_improvement,
                 
                 # 综合评估
-                'overall_assessment': self._assess_overall_improvement(baseline_metrics, rag_metrics, baseline_organ_accuracy, rag_organ_accuracy)
+                'overall_assessment': self._assess_overall_improvement(baseline_metrics, rag_metrics, baseline_organ_accuracy, rag_organ_accuracy, metrics_improvement)
             }
         
         return comparison
@@ -533,9 +914,10 @@ class RerunWorkflow:
             }
         
         # 部分匹配检查（简单的包含关系）
+        predicted_lower = predicted_organ.lower()
         for expected_organ in expected_organs:
-            if (predicted_organ.lower() in expected_organ.lower() or 
-                expected_organ.lower() in predicted_organ.lower()):
+            expected_lower = expected_organ.lower()
+            if predicted_lower in expected_lower or expected_lower in predicted_lower:
                 return {
                     'category': 'partial_match',
                     'score': 0.6,
@@ -549,7 +931,7 @@ class RerunWorkflow:
             'description': f'完全错误: 预测"{predicted_organ}" 不匹配期望{expected_organs}'
         }
 
-    def _calculate_location_metrics(self, predicted_locations: List[str], expected_locations: List[str]) -> Dict[str, float]:
+    def _calculate_location_metrics(self, predicted_locations: List[str], expected_locations: Collection[str]) -> Dict[str, float]:
         """计算解剖位置的各项评估指标"""
         if not expected_locations:
             return {
@@ -569,17 +951,20 @@ class RerunWorkflow:
                 'overall_score': 0.0
             }
         
-        # 计算正确识别的数量
-        correct_count = 0
-        for location in predicted_locations:
-            if location in expected_locations:
-                correct_count += 1
+        # 计算正确识别的数量：对期望位置集合做哈希查找（重复预测的位置仍逐个计数；不可哈希的值不可能与位置字符串相等）
+        expected_set = expected_locations if isinstance(expected_locations, (set, frozenset)) else frozenset(expected_locations)
+        correct_count = sum(
+            1 for location in predicted_locations
+            if isinstance(location, Hashable) and location in expected_set
+        )
+        predicted_count = len(predicted_locations)
+        expected_count = len(expected_locations)
         
         # 精确率 = 正确识别数量 / 预测总数量
-        precision = correct_count / len(predicted_locations)
+        precision = correct_count / predicted_count
         
         # 召回率 = 正确识别数量 / 期望总数量
-        recall = correct_count / len(expected_locations)
+        recall = correct_count / expected_count
         
         # F1分数
         f1_score = 0.0
@@ -587,8 +972,8 @@ class RerunWorkflow:
             f1_score = 2 * (precision * recall) / (precision + recall)
         
         # 过度生成惩罚
-        over_generation = max(0, len(predicted_locations) - len(expected_locations))
-        overgeneration_penalty = 1.0 - (over_generation / max(len(expected_locations), 1))
+        over_generation = max(0, predicted_count - expected_count)
+        overgeneration_penalty = 1.0 - (over_generation / max(expected_count, 1))
         overgeneration_penalty = max(0.0, overgeneration_penalty)
         
         # 综合得分 (100分制)
@@ -603,8 +988,15 @@ class RerunWorkflow:
         }
 
     def _assess_overall_improvement(self, baseline_metrics: Dict[str, float], rag_metrics: Dict[str, float], 
-                                  baseline_organ: Dict[str, Any], rag_organ: Dict[str, Any]) -> str:
-        """评估RAG增强的整体改善情况"""
+                                  baseline_organ: Dict[str, Any], rag_organ: Dict[str, Any],
+                                  metrics_improvement: Dict[str, float] = None) -> str:
+        """评估RAG增强的整体改善情况，metrics_improvement 为已算好的各指标差值（未提供时现算）"""
+        if metrics_improvement is None:
+            metrics_improvement = {
+                improvement_key: rag_metrics[metric_key] - baseline_metrics[metric_key]
+                for metric_key, improvement_key, _ in _METRIC_IMPROVEMENTS
+            }
+        
         improvements = []
         
         # 器官准确率改善
@@ -612,285 +1004,92 @@ class RerunWorkflow:
             improvements.append(f"器官识别改善 ({baseline_organ['category']} → {rag_organ['category']})")
         
         # 各项指标改善
-        if rag_metrics['precision'] > baseline_metrics['precision']:
-            improvements.append(f"精确率提升 {rag_metrics['precision'] - baseline_metrics['precision']:.1f}%")
-        
-        if rag_metrics['recall'] > baseline_metrics['recall']:
-            improvements.append(f"召回率提升 {rag_metrics['recall'] - baseline_metrics['recall']:.1f}%")
-        
-        if rag_metrics['f1_score'] > baseline_metrics['f1_score']:
-            improvements.append(f"F1分数提升 {rag_metrics['f1_score'] - baseline_metrics['f1_score']:.1f}%")
-        
-        if rag_metrics['overall_score'] > baseline_metrics['overall_score']:
-            improvements.append(f"综合得分提升 {rag_metrics['overall_score'] - baseline_metrics['overall_score']:.1f}分")
+        for _, improvement_key, template in _METRIC_IMPROVEMENTS:
+            delta = metrics_improvement[improvement_key]
+            if delta > 0:
+                improvements.append(template.format(delta))
         
         if improvements:
             return "✅ RAG增强有效: " + "; ".join(improvements)
-        elif rag_metrics['overall_score'] == baseline_metrics['overall_score']:
+        elif metrics_improvement['overall_improvement'] == 0:
             return "⚪ RAG增强无明显影响"
         else:
             return "❌ RAG增强可能产生负面影响"
 
-    def _generate_evaluation_summary(self, all_comparisons: Dict[str, Any], baseline_data: Dict[str, Any]) -> Dict[str, Any]:
-        """生成简化的评测结果摘要，按用户要求的格式"""
+    def _generate_evaluation_summary(self, all_comparisons: Dict[str, Any], baseline_data: Dict[str, Any],
+                                     generated_at: Optional[datetime] = None) -> Dict[str, Any]:
+        """生成简化的评测结果摘要，按用户要求的格式；generated_at 为摘要时间戳，缺省取当前时间"""
         evaluation_summary = {}
         
         for symptom_text, comparisons in all_comparisons.items():
             # 获取期望结果
-            expected_organs = []
-            expected_locations = []
-            if symptom_text in baseline_data:
-                for expected_result in baseline_data[symptom_text]['expected_organs']:
-                    if isinstance(expected_result, dict):
-                        organ_name = expected_result.get('organName', '')
-                        locations = expected_result.get('anatomicalLocations', [])
-                        if organ_name:
-                            expected_organs.append(organ_name)
-                        expected_locations.extend(locations)
-            
-            # 去重
-            expected_organs = list(set(expected_organs))
-            expected_locations = list(set(expected_locations))
+            expected_organs, expected_locations = _collect_expected(
+                baseline_data.get(symptom_text, {}).get('expected_organs', [])
+            )
             
             symptom_summary = {
                 "expected_outcome": {
-                    "organs": expected_organs,
-                    "anatomical_locations": expected_locations
+                    "organs": list(expected_organs),
+                    "anatomical_locations": list(expected_locations)
                 }
             }
             
-            # 为每个API生成对比结果
+            # 为每个API生成对比结果: Baseline结果、RAG增强结果与改善分析
             for api_name, comparison in comparisons.items():
-                # Baseline API结果
-                baseline_outcome = {
-                    "organ": comparison.get('baseline_organ', ''),
-                    "anatomical_locations": comparison.get('baseline_locations', []),
-                    "metrics": comparison.get('baseline_metrics', {}),
-                    "organ_accuracy": comparison.get('baseline_organ_accuracy', {})
-                }
-                
-                # RAG增强结果
-                rag_outcome = {
-                    "organ": comparison.get('rag_organ', ''),
-                    "anatomical_locations": comparison.get('rag_locations', []),
-                    "metrics": comparison.get('rag_metrics', {}),
-                    "organ_accuracy": comparison.get('rag_organ_accuracy', {})
-                }
-                
-                # 改善分析
-                improvement_analysis = {
-                    "metrics_improvement": comparison.get('metrics_improvement', {}),
-                    "assessment": comparison.get('overall_assessment', ''),
-                    "organ_improved": comparison.get('organ_accuracy_improved', False),
-                    "locations_changed": comparison.get('locations_changed', False)
-                }
-                
-                symptom_summary[f"{api_name}_baseline_outcome"] = baseline_outcome
-                symptom_summary[f"{api_name}_with_rag_outcome"] = rag_outcome
-                symptom_summary[f"{api_name}_improvement"] = improvement_analysis
+                symptom_summary.update({
+                    f"{api_name}_baseline_outcome": {
+                        "organ": comparison.get('baseline_organ', ''),
+                        "anatomical_locations": comparison.get('baseline_locations', []),
+                        "metrics": comparison.get('baseline_metrics', {}),
+                        "organ_accuracy": comparison.get('baseline_organ_accuracy', {})
+                    },
+                    f"{api_name}_with_rag_outcome": {
+                        "organ": comparison.get('rag_organ', ''),
+                        "anatomical_locations": comparison.get('rag_locations', []),
+                        "metrics": comparison.get('rag_metrics', {}),
+                        "organ_accuracy": comparison.get('rag_organ_accuracy', {})
+                    },
+                    f"{api_name}_improvement": {
+                        "metrics_improvement": comparison.get('metrics_improvement', {}),
+                        "assessment": comparison.get('overall_assessment', ''),
+                        "organ_improved": comparison.get('organ_accuracy_improved', False),
+                        "locations_changed": comparison.get('locations_changed', False)
+                    }
+                })
             
-            # 使用症状文本的前50个字符作为键名
-            symptom_key = symptom_text[:50] + "..." if len(symptom_text) > 50 else symptom_text
+            # 使用症状文本的前50个字符作为键名；前缀相同的不同症状追加序号，避免互相覆盖
+            symptom_key = (symptom_text[:50] + "...") if len(symptom_text) > 50 else symptom_text
+            if symptom_key in evaluation_summary:
+                suffix = 2
+                while f"{symptom_key} ({suffix})" in evaluation_summary:
+                    suffix += 1
+                symptom_key = f"{symptom_key} ({suffix})"
             evaluation_summary[symptom_key] = symptom_summary
         
         return {
             "report_id": self.report_id,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": (generated_at or datetime.now()).isoformat(),
             "total_symptoms": len(evaluation_summary),
             "symptoms": evaluation_summary
         }
 
     def _generate_score_report(self, simplified_results: Dict[str, Any], result_folder: Path, timestamp: str) -> Path:
         """生成RAG效果分数报告 (TXT格式)"""
-        report_path = result_folder / f"report_{self.report_id}_rag_score_report.txt"
-        
-        # 收集所有API名称
-        api_names = set()
-        for symptom_data in simplified_results['symptoms'].values():
-            for key in symptom_data.keys():
-                if key.endswith('_improvement'):
-                    api_name = key.replace('_improvement', '')
-                    api_names.add(api_name)
-        
-        api_names = sorted(list(api_names))
-        
-        # 准备统计数据
-        api_stats = {}
-        for api_name in api_names:
-            api_stats[api_name] = {
-                'precision_improvements': [],
-                'recall_improvements': [],
-                'f1_improvements': [],
-                'overall_improvements': [],
-                'positive_effects': 0,
-                'negative_effects': 0,
-                'no_effects': 0,
-                'organ_improvements': 0
-            }
-        
-        # 收集每个症状的数据
-        symptom_details = []
-        for symptom_name, symptom_data in simplified_results['symptoms'].items():
-            symptom_info = {
-                'name': symptom_name,
-                'apis': {}
-            }
-            
-            for api_name in api_names:
-                improvement_key = f"{api_name}_improvement"
-                if improvement_key in symptom_data:
-                    improvement = symptom_data[improvement_key]
-                    metrics = improvement.get('metrics_improvement', {})
-                    
-                    # 收集统计数据
-                    precision_imp = metrics.get('precision_improvement', 0)
-                    recall_imp = metrics.get('recall_improvement', 0)
-                    f1_imp = metrics.get('f1_improvement', 0)
-                    overall_imp = metrics.get('overall_improvement', 0)
-                    
-                    api_stats[api_name]['precision_improvements'].append(precision_imp)
-                    api_stats[api_name]['recall_improvements'].append(recall_imp)
-                    api_stats[api_name]['f1_improvements'].append(f1_imp)
-                    api_stats[api_name]['overall_improvements'].append(overall_imp)
-                    
-                    # 分类效果
-                    if overall_imp > 0:
-                        api_stats[api_name]['positive_effects'] += 1
-                    elif overall_imp < 0:
-                        api_stats[api_name]['negative_effects'] += 1
-                    else:
-                        api_stats[api_name]['no_effects'] += 1
-                    
-                    # 器官改善
-                    if improvement.get('organ_improved', False):
-                        api_stats[api_name]['organ_improvements'] += 1
-                    
-                    # 保存症状详情
-                    symptom_info['apis'][api_name] = {
-                        'precision_improvement': precision_imp,
-                        'recall_improvement': recall_imp,
-                        'f1_improvement': f1_imp,
-                        'overall_improvement': overall_imp,
-                        'assessment': improvement.get('assessment', ''),
-                        'organ_improved': improvement.get('organ_improved', False),
-                        'locations_changed': improvement.get('locations_changed', False)
-                    }
-            
-            symptom_details.append(symptom_info)
-        
-        # 计算平均值
-        for api_name in api_names:
-            stats = api_stats[api_name]
-            if stats['precision_improvements']:
-                stats['avg_precision'] = sum(stats['precision_improvements']) / len(stats['precision_improvements'])
-                stats['avg_recall'] = sum(stats['recall_improvements']) / len(stats['recall_improvements'])
-                stats['avg_f1'] = sum(stats['f1_improvements']) / len(stats['f1_improvements'])
-                stats['avg_overall'] = sum(stats['overall_improvements']) / len(stats['overall_improvements'])
-            else:
-                stats['avg_precision'] = 0.0
-                stats['avg_recall'] = 0.0
-                stats['avg_f1'] = 0.0
-                stats['avg_overall'] = 0.0
-        
-        # 生成报告
-        with open(report_path, 'w', encoding='utf-8') as f:
-            f.write("=" * 80 + "\n")
-            f.write(f"RAG 效果分析报告 - Report {self.report_id}\n")
-            f.write("=" * 80 + "\n")
-            f.write(f"生成时间: {timestamp}\n")
-            f.write(f"总症状数: {len(symptom_details)}\n")
-            f.write(f"评测APIs: {', '.join(api_names)}\n")
-            f.write("\n")
-            
-            # 1. 总体效果概览
-            f.write("█ 总体效果概览\n")
-            f.write("-" * 60 + "\n")
-            for api_name in api_names:
-                stats = api_stats[api_name]
-                total_symptoms = len(stats['overall_improvements'])
-                f.write(f"\n【{api_name.upper()}】\n")
-                f.write(f"  ✅ 改善症状: {stats['positive_effects']}/{total_symptoms} ({stats['positive_effects']/total_symptoms*100:.1f}%)\n")
-                f.write(f"  ❌ 负面影响: {stats['negative_effects']}/{total_symptoms} ({stats['negative_effects']/total_symptoms*100:.1f}%)\n")
-                f.write(f"  ⚪ 无明显变化: {stats['no_effects']}/{total_symptoms} ({stats['no_effects']/total_symptoms*100:.1f}%)\n")
-                f.write(f"  🎯 器官识别改善: {stats['organ_improvements']}/{total_symptoms} ({stats['organ_improvements']/total_symptoms*100:.1f}%)\n")
-            f.write("\n")
-            
-            # 2. 平均指标改善
-            f.write("█ 平均指标改善\n")
-            f.write("-" * 60 + "\n")
-            f.write(f"{'API':<12} {'精确率':<10} {'召回率':<10} {'F1分数':<10} {'综合得分':<10}\n")
-            f.write("-" * 60 + "\n")
-            for api_name in api_names:
-                stats = api_stats[api_name]
-                f.write(f"{api_name:<12} ")
-                f.write(f"{stats['avg_precision']:+6.1f}%   ")
-                f.write(f"{stats['avg_recall']:+6.1f}%   ")
-                f.write(f"{stats['avg_f1']:+6.1f}%   ")
-                f.write(f"{stats['avg_overall']:+6.1f}分\n")
-            f.write("\n")
-            
-            # 3. 各症状详细分析
-            f.write("█ 各症状详细分析\n")
-            f.write("-" * 80 + "\n")
-            for i, symptom_info in enumerate(symptom_details, 1):
-                f.write(f"\n{i}. 【{symptom_info['name']}】\n")
-                f.write("-" * 40 + "\n")
-                
-                for api_name in api_names:
-                    if api_name in symptom_info['apis']:
-                        api_data = symptom_info['apis'][api_name]
-                        f.write(f"\n  [{api_name.upper()}]\n")
-                        f.write(f"    精确率改善: {api_data['precision_improvement']:+6.1f}%\n")
-                        f.write(f"    召回率改善: {api_data['recall_improvement']:+6.1f}%\n")
-                        f.write(f"    F1分数改善: {api_data['f1_improvement']:+6.1f}%\n")
-                        f.write(f"    综合得分改善: {api_data['overall_improvement']:+6.1f}分\n")
-                        f.write(f"    器官识别改善: {'是' if api_data['organ_improved'] else '否'}\n")
-                        f.write(f"    位置信息变化: {'是' if api_data['locations_changed'] else '否'}\n")
-                        f.write(f"    总体评估: {api_data['assessment']}\n")
-                f.write("\n")
-            
-            # 4. 结论与建议
-            f.write("█ 结论与建议\n")
-            f.write("-" * 60 + "\n")
-            
-            # 找出表现最好和最差的API
-            best_api = max(api_names, key=lambda x: api_stats[x]['avg_overall'])
-            worst_api = min(api_names, key=lambda x: api_stats[x]['avg_overall'])
-            
-            f.write(f"\n【最佳表现API】: {best_api.upper()}\n")
-            f.write(f"  平均综合得分改善: {api_stats[best_api]['avg_overall']:+.1f}分\n")
-            f.write(f"  改善症状比例: {api_stats[best_api]['positive_effects']/len(api_stats[best_api]['overall_improvements'])*100:.1f}%\n")
-            
-            f.write(f"\n【需要改进API】: {worst_api.upper()}\n")
-            f.write(f"  平均综合得分改善: {api_stats[worst_api]['avg_overall']:+.1f}分\n")
-            f.write(f"  负面影响症状比例: {api_stats[worst_api]['negative_effects']/len(api_stats[worst_api]['overall_improvements'])*100:.1f}%\n")
-            
-            # 总体RAG效果评估
-            total_positive = sum(stats['positive_effects'] for stats in api_stats.values())
-            total_negative = sum(stats['negative_effects'] for stats in api_stats.values())
-            total_evaluations = sum(len(stats['overall_improvements']) for stats in api_stats.values())
-            
-            f.write(f"\n【总体RAG效果】:\n")
-            f.write(f"  积极影响: {total_positive}/{total_evaluations} ({total_positive/total_evaluations*100:.1f}%)\n")
-            f.write(f"  负面影响: {total_negative}/{total_evaluations} ({total_negative/total_evaluations*100:.1f}%)\n")
-            
-            if total_positive > total_negative:
-                f.write(f"  🎯 结论: RAG增强总体上**有效**，建议继续使用和优化\n")
-            elif total_positive < total_negative:
-                f.write(f"  ⚠️  结论: RAG增强存在问题，建议检查检索质量和增强策略\n")
-            else:
-                f.write(f"  ⚪ 结论: RAG增强效果不明显，建议优化检索模型和增强方法\n")
-            
-            f.write("\n" + "=" * 80 + "\n")
-        
-        return report_path
+        return _write_score_report(self.report_id, simplified_results, result_folder, timestamp, self.emit_details)
 
 
-if __name__ == "__main__":
+def main(argv: List[str] = None) -> bool:
+    """命令行入口，也可由其他脚本直接调用"""
     parser = argparse.ArgumentParser(description="使用已有的RAG检索结果重新运行LLM评估。")
     parser.add_argument("report_id", type=int, help="需要处理的报告ID (例如: 4000)")
     parser.add_argument("--config", default="config/config.yaml", help="配置文件路径")
-    args = parser.parse_args()
+    parser.add_argument("--no_details", action="store_true", help="分数报告中省略各症状详细分析，只保留概览与结论")
+    parser.add_argument("--cache", action="store_true", help="复用LLM响应缓存中原文相同请求的回答（结果中标记 cached）")
+    args = parser.parse_args(argv)
+
+    workflow = RerunWorkflow(args.report_id, args.config, emit_details=not args.no_details, use_cache=args.cache)
+    return workflow.run()
 
-    workflow = RerunWorkflow(args.report_id, args.config)
-    workflow.run()
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
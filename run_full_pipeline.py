@@ -14,28 +14,96 @@
 """
 
 import argparse
+import codecs
+import os
+import shlex
 import subprocess
 import sys
+import threading
 from pathlib import Path
 
 
+def _pump(stream, sink) -> None:
+    """将子进程的输出流按块转发到当前进程
+
+    用 read1 读取管道中已到达的字节，不等待换行，用回车符刷新的进度条也能实时显示
+    """
+    # 直接写入底层字节流前先清空文本层缓冲，保证与 print 输出的先后顺序
+    sink.flush()
+    buffer = getattr(sink, 'buffer', None)
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    for chunk in iter(lambda: stream.read1(8192), b''):
+        if buffer is not None:
+            buffer.write(chunk)
+        else:
+            sink.write(decoder.decode(chunk))
+        sink.flush()
+    stream.close()
+
+
 def run_command(command: str, description: str) -> bool:
     """运行命令并实时显示输出"""
     print(f"\n🚀 {description}")
     print(f"💻 执行命令: {command}")
     print("=" * 80)
     
+    # 实时转发子进程输出，stderr 由独立线程转发，避免任一管道写满阻塞；
+    # PYTHONUNBUFFERED 让脚本再启动的Python子进程在管道下也不缓冲输出
     try:
-        # 实时输出而不是捕获
-        result = subprocess.run(command, shell=True, check=True, text=True)
+        proc = subprocess.Popen(
+            shlex.split(command),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env={**os.environ, "PYTHONUNBUFFERED": "1"}
+        )
+    except OSError as e:
         print("=" * 80)
+        print(f"❌ {description} - 失败")
+        print(f"无法启动命令: {e}")
+        return False
+    stderr_pump = threading.Thread(target=_pump, args=(proc.stderr, sys.stderr), daemon=True)
+    stderr_pump.start()
+    _pump(proc.stdout, sys.stdout)
+    returncode = proc.wait()
+    stderr_pump.join()
+    
+    print("=" * 80)
+    if returncode == 0:
         print(f"✅ {description} - 成功完成")
         return True
-    except subprocess.CalledProcessError as e:
-        print("=" * 80)
+    print(f"❌ {description} - 失败")
+    print(f"错误码: {returncode}")
+    return False
+
+
+def _rerun_with_rag(report_id: int) -> bool:
+    """步骤2：在当前进程内运行RAG增强评估
+
+    rerun_with_rag 导入失败时会调用 sys.exit，因此在此延迟导入，失败只记为本步骤失败
+    """
+    import rerun_with_rag
+    return rerun_with_rag.main([str(report_id)])
+
+
+def run_step(step, description: str) -> bool:
+    """在当前进程内直接调用某一步骤，异常视为失败"""
+    print(f"\n🚀 {description}")
+    print("=" * 80)
+    
+    try:
+        success = bool(step())
+    except SystemExit as e:
+        success = not e.code
+    except Exception as e:
+        print(f"异常: {e}")
+        success = False
+    
+    print("=" * 80)
+    if success:
+        print(f"✅ {description} - 成功完成")
+    else:
         print(f"❌ {description} - 失败")
-        print(f"错误码: {e.returncode}")
-        return False
+    return success
 
 
 def main():
@@ -65,15 +133,14 @@ def main():
         print(f"📊 处理报告 {report_id} ({success_count + 1}/{total_reports})")
         print(f"{'='*40}")
         
-        # Step 1: RAG检索
+        # Step 1: RAG检索（需切换到 RAG_Build conda 环境，只能以子进程运行）
         step1_cmd = f"bash {base_dir}/scripts/step1_rag_retrieve.sh {report_id} {report_id} {top_k}"
         if not run_command(step1_cmd, f"RAG检索 (报告 {report_id})"):
             print(f"⚠️  跳过报告 {report_id} 的后续步骤")
             continue
         
-        # Step 2: RAG增强评估
-        step2_cmd = f"python {base_dir}/rerun_with_rag.py {report_id}"
-        if not run_command(step2_cmd, f"RAG增强评估 (报告 {report_id})"):
+        # Step 2: RAG增强评估（与本脚本同一环境，直接调用避免再启动解释器）
+        if not run_step(lambda: _rerun_with_rag(report_id), f"RAG增强评估 (报告 {report_id})"):
             print(f"⚠️  报告 {report_id} 的RAG增强评估失败")
             continue
         
@@ -28,6 +28,7 @@ from api_clients.anthropic_client import AnthropicClient
 from api_clients.gemini_client import GeminiClient
 from api_clients.moonshot_client import MoonshotClient
 from api_clients.deepseek_client import DeepseekClient
+from api_clients._rate_limit import RateLimiter, estimate_tokens
 
 class APIManager:
     """整合的API管理器 - 支持多种API客户端和症状处理"""
@@ -41,6 +42,10 @@ class APIManager:
             'moonshot': MoonshotClient,
             'deepseek': DeepseekClient
         }
+        # 可选的响应缓存（需提供 make_key/get/set，见 utils.response_cache.ResponseCache）
+        self.response_cache = None
+        # 按提供商的限流器（仅为配置了 rpm/tpm 的API创建）
+        self.rate_limiters = {}
     
     def initialize_clients(self, config: Dict[str, Any]) -> bool:
         """初始化所有API客户端"""
@@ -81,6 +86,11 @@ class APIManager:
                     )
                 
                 self.clients[provider] = client
+                if client_config.get('rpm') or client_config.get('tpm'):
+                    self.rate_limiters[provider] = RateLimiter(
+                        requests_per_minute=client_config.get('rpm'),
+                        tokens_per_minute=client_config.get('tpm')
+                    )
                 print(f"✅ {provider.capitalize()} 客户端初始化成功")
                 success_count += 1
                 
@@ -180,19 +190,37 @@ class APIManager:
 
         for name, client in self.clients.items():
             try:
-                response = client.generate_response(
-                    system_prompt=system_prompt,
-                    user_prompt=symptom_text
-                )
+                cache_key = None
+                response = None
+                if self.response_cache is not None:
+                    cache_key = self.response_cache.make_key(name, getattr(client, 'model', ''), system_prompt, symptom_text)
+                    response = self.response_cache.get(cache_key)
+                    if response is not None:
+                        # 标记来自缓存的响应（其 response_time 为原始调用的耗时），便于结果中区分
+                        response['cached'] = True
                 
-                # 确保响应包含解析后的数据
-                if response.get('success') and not response.get('organ_name'):
-                    # 如果API客户端没有解析数据，尝试手动解析
-                    if 'response' in response and response['response']:
-                        parsed_data = self._extract_and_parse_json(response['response'])
-                        response['parsed_data'] = parsed_data
-                        response['organ_name'] = parsed_data.get('organ_name', '')
-                        response['anatomical_locations'] = parsed_data.get('anatomical_locations', [])
+                if response is None:
+                    # 并发请求在限额内排队发出，避免集中触发429后各自退避
+                    rate_limiter = self.rate_limiters.get(name)
+                    if rate_limiter is not None:
+                        rate_limiter.acquire(estimate_tokens(system_prompt, symptom_text))
+                    
+                    response = client.generate_response(
+                        system_prompt=system_prompt,
+                        user_prompt=symptom_text
+                    )
+                    
+                    # 确保响应包含解析后的数据
+                    if response.get('success') and not response.get('organ_name'):
+                        # 如果API客户端没有解析数据，尝试手动解析
+                        if 'response' in response and response['response']:
+                            parsed_data = self._extract_and_parse_json(response['response'])
+                            response['parsed_data'] = parsed_data
+                            response['organ_name'] = parsed_data.get('organ_name', '')
+                            response['anatomical_locations'] = parsed_data.get('anatomical_locations', [])
+                    
+                    if cache_key is not None:
+                        self.response_cache.set(cache_key, response)
                 
                 # 将期望结果附加到每个响应中，以便后续评估
                 response['expected_results'] = symptom_data.get('expected_results', [])
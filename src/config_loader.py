@@ -1,7 +1,15 @@
 import yaml
 import os
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+# 同一进程内已解析的配置，按 (绝对路径, 修改时间) 缓存
+_CACHED: Dict[Tuple[str, float], Dict[str, Any]] = {}
 
 class ConfigLoader:
     """配置加载器"""
@@ -17,8 +25,11 @@ class ConfigLoader:
         if not self.config_path.exists():
             raise FileNotFoundError(f"配置文件不存在: {self.config_path}")
             
-        with open(self.config_path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
+        cache_key = (str(self.config_path.resolve()), self.config_path.stat().st_mtime)
+        if cache_key not in _CACHED:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                _CACHED[cache_key] = yaml.load(f, Loader=_Loader)
+        return _CACHED[cache_key]
     
     def _load_env_vars(self):
         """加载环境变量"""
@@ -9,6 +9,19 @@ import os
 from typing import List, Dict, Any, Iterator
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _read_json(file_path: Path) -> Any:
+    """一次性读入文件字节并解析JSON，安装了 orjson 时使用其C实现"""
+    if orjson is not None:
+        return orjson.loads(Path(file_path).read_bytes())
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
 class DataLoader:
     """整合的数据加载器 - 支持Report级别和症状级别处理"""
     
@@ -62,8 +75,7 @@ class DataLoader:
         返回Report级别的结构化数据
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = json.load(f)
+            content = _read_json(file_path)
             
             report_data = {
                 'report_id': file_path.stem,
@@ -121,8 +133,7 @@ class DataLoader:
         保持向后兼容性，但建议使用load_report_data
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = json.load(f)
+            content = _read_json(file_path)
             
             pairs = []
             if isinstance(content, list):
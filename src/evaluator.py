@@ -6,7 +6,8 @@
 
 import json
 from datetime import datetime
-from typing import Dict, Any, List
+from functools import lru_cache
+from typing import Dict, Any, List, FrozenSet, Tuple
 from pathlib import Path
 
 class Evaluator:
@@ -54,20 +55,13 @@ class Evaluator:
                 'detailed_analysis': '缺少解剖位置信息'
             }
         
-        # 1. 计算Precision (精确率) - 40%权重
-        precision = self._calculate_precision(actual_locations, expected_locations)
-        
-        # 2. 计算Recall (召回率) - 40%权重
-        recall = self._calculate_recall(actual_locations, expected_locations)
-        
-        # 3. 计算过度生成惩罚 - 20%权重
-        overgeneration_penalty = self._calculate_overgeneration_penalty(actual_locations, expected_locations)
-        
-        # 4. 计算综合得分 (100分制)
-        overall_score = (precision * 0.4 + recall * 0.4 + overgeneration_penalty * 0.2) * 100
-        
-        # 5. 生成详细分析
-        analysis = self._generate_analysis(actual_locations, expected_locations, precision, recall, overgeneration_penalty)
+        # 相同的预测/期望位置组合反复出现，按其规范化形式缓存打分结果
+        try:
+            scores = _score(tuple(sorted(actual_locations)), frozenset(expected_locations))
+        except TypeError:
+            # 位置中含不可哈希/不可排序的值时退回直接计算
+            scores = _score.__wrapped__(tuple(actual_locations), expected_locations)
+        overall_score, precision, recall, overgeneration_penalty, analysis = scores
         
         return {
             'overall_score': round(overall_score, 1),
@@ -213,7 +207,8 @@ class Evaluator:
             print(f"❌ 保存Report {report_id} 结果失败: {e}")
             raise
     
-    def _calculate_precision(self, actual_locations: List[str], expected_locations: List[str]) -> float:
+    @staticmethod
+    def _calculate_precision(actual_locations: List[str], expected_locations: List[str]) -> float:
         """计算Precision (精确率)"""
         if not actual_locations:
             return 0.0
@@ -228,7 +223,8 @@ class Evaluator:
         precision = correct_count / len(actual_locations)
         return precision
     
-    def _calculate_recall(self, actual_locations: List[str], expected_locations: List[str]) -> float:
+    @staticmethod
+    def _calculate_recall(actual_locations: List[str], expected_locations: List[str]) -> float:
         """计算Recall (召回率)"""
         if not expected_locations:
             return 0.0
@@ -243,7 +239,8 @@ class Evaluator:
         recall = correct_count / len(expected_locations)
         return recall
     
-    def _calculate_overgeneration_penalty(self, actual_locations: List[str], expected_locations: List[str]) -> float:
+    @staticmethod
+    def _calculate_overgeneration_penalty(actual_locations: List[str], expected_locations: List[str]) -> float:
         """计算过度生成惩罚"""
         if not expected_locations:
             return 0.0
@@ -272,8 +269,9 @@ class Evaluator:
         
         return penalty
     
-    def _generate_analysis(self, actual_locations: List[str], expected_locations: List[str], 
-                          precision: float, recall: float, overgeneration_penalty: float) -> str:
+    @staticmethod
+    def _generate_analysis(actual_locations: List[str], expected_locations: List[str], 
+                           precision: float, recall: float, overgeneration_penalty: float) -> str:
         """生成详细分析报告"""
         # 计算正确数量
         correct_count = 0
@@ -286,3 +284,24 @@ class Evaluator:
         analysis += f"过度生成惩罚: {overgeneration_penalty:.1%}"
         
         return analysis
+
+
+@lru_cache(maxsize=8192)
+def _score(actual_locations: Tuple[str, ...], expected_locations: FrozenSet[str]) -> Tuple[float, float, float, float, str]:
+    """计算综合得分、精确率、召回率、过度生成惩罚及分析文本"""
+    # 1. 计算Precision (精确率) - 40%权重
+    precision = Evaluator._calculate_precision(actual_locations, expected_locations)
+    
+    # 2. 计算Recall (召回率) - 40%权重
+    recall = Evaluator._calculate_recall(actual_locations, expected_locations)
+    
+    # 3. 计算过度生成惩罚 - 20%权重
+    overgeneration_penalty = Evaluator._calculate_overgeneration_penalty(actual_locations, expected_locations)
+    
+    # 4. 计算综合得分 (100分制)
+    overall_score = (precision * 0.4 + recall * 0.4 + overgeneration_penalty * 0.2) * 100
+    
+    # 5. 生成详细分析
+    analysis = Evaluator._generate_analysis(actual_locations, expected_locations, precision, recall, overgeneration_penalty)
+    
+    return overall_score, precision, recall, overgeneration_penalty, analysis
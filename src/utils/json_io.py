@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+结果文件的JSON读写
+安装了 orjson 时使用其C实现序列化/解析，否则回退到标准库 json；
+以 .gz 结尾的文件按gzip压缩读写；.jsonl 文件每行一条紧凑JSON记录
+"""
+
+import gzip
+import json
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(payload) -> Any:
+    """解析JSON文本（str或bytes），解析失败抛出 json.JSONDecodeError"""
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+
+def write_json(data: Any, path: Path):
+    """以2空格缩进写出UTF-8 JSON：先在内存中序列化，再一次性写入文件"""
+    path = Path(path)
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+def write_json_gz(data: Any, path: Path, compresslevel: int = 3):
+    """写出紧凑（无缩进）的gzip压缩JSON，用于只供程序读取的大文件"""
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    else:
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    with gzip.open(path, 'wb', compresslevel=compresslevel) as f:
+        f.write(payload)
+
+
+def read_json(path: Path) -> Any:
+    """读取JSON文件，按扩展名自动识别gzip压缩"""
+    path = Path(path)
+    if path.suffix == '.gz':
+        with gzip.open(path, 'rb') as f:
+            payload = f.read()
+    else:
+        payload = path.read_bytes()
+    return loads(payload)
+
+
+def append_jsonl(record: Any, f: BinaryIO):
+    """向以二进制追加模式打开的文件写入一行紧凑JSON记录"""
+    if orjson is not None:
+        f.write(orjson.dumps(record, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE))
+    else:
+        f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n')
+
+
+def iter_jsonl(path: Path) -> Iterator[Any]:
+    """逐行读取JSONL文件，跳过空行"""
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
@@ -5,6 +5,7 @@ Report级别的日志记录器
 """
 
 import logging
+import logging.handlers
 import sys
 from datetime import datetime
 from pathlib import Path
@@ -52,6 +53,51 @@ class ReportLogger:
 
         return self.loggers[report_id]
 
+    def get_workflow_logger(self, verbose: bool = False) -> logging.Logger:
+        """获取主工作流程的日志记录器
+
+        文件日志写入滚动的 workflow.log，经内存缓冲批量落盘（WARNING及以上立即刷新）；
+        控制台默认只输出警告和错误，verbose 时同时输出逐症状的进度信息
+        """
+        logger = logging.getLogger("workflow")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+        # 避免重复添加处理器
+        if not logger.handlers:
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S'
+            )
+
+            # 创建滚动文件处理器，外层用内存缓冲减少逐行写盘
+            file_handler = logging.handlers.RotatingFileHandler(
+                self.log_dir / "workflow.log", maxBytes=10 * 1024 * 1024, backupCount=5, encoding='utf-8'
+            )
+            file_handler.setFormatter(formatter)
+            buffered_handler = logging.handlers.MemoryHandler(
+                capacity=1000, flushLevel=logging.WARNING, target=file_handler
+            )
+
+            # 创建控制台处理器
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(logging.Formatter('%(message)s'))
+
+            logger.addHandler(buffered_handler)
+            logger.addHandler(console_handler)
+
+        # 控制台级别随 verbose 调整
+        for handler in logger.handlers:
+            if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
+                handler.setLevel(logging.INFO if verbose else logging.WARNING)
+
+        return logger
+
+    def flush_workflow_logger(self):
+        """将缓冲中的工作流程日志写入文件"""
+        for handler in logging.getLogger("workflow").handlers:
+            handler.flush()
+
     def log_report_start(self, report_id: str, report_data: Dict[str, Any]):
         """记录Report开始处理"""
         logger = self.get_logger(report_id)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+API响应缓存
+以 (API名称, 模型, 系统提示词, 用户提示词) 为键缓存成功的API响应，
+不同报告中重复出现的症状只调用一次API；缓存同时持久化到磁盘，重新运行时继续复用
+"""
+
+import copy
+import hashlib
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from .json_io import write_json, read_json
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_symptom_text(text: str) -> str:
+    """小写并合并连续空白，措辞相同仅大小写或空格不同的症状视为同一条"""
+    return _WHITESPACE.sub(' ', text).strip().lower()
+
+
+class ResponseCache:
+    """内存 + 磁盘两级的API响应缓存，线程安全"""
+
+    def __init__(self, cache_dir: Path, normalize: bool = True):
+        """normalize=True 时用户提示词按 normalize_symptom_text 规范化后参与键计算（适用于纯症状文本）；
+        为False时按原文精确匹配，适用于包含RAG检索内容等不能忽略大小写/空白差异的提示词"""
+        self.cache_dir = Path(cache_dir)
+        self.normalize = normalize
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._memory: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, api_name: str, model: str, system_prompt: str, symptom_text: str, **params) -> str:
+        """由请求的决定性参数生成缓存键；params 为影响输出的其他请求参数（如 max_tokens、temperature）"""
+        if self.normalize:
+            symptom_text = normalize_symptom_text(symptom_text)
+        digest = hashlib.blake2b(digest_size=20)
+        parts = [api_name, model, system_prompt, symptom_text]
+        parts.extend(f"{name}={value!r}" for name, value in sorted(params.items()))
+        for part in parts:
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\x00')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的响应副本，未命中返回None"""
+        # 命中/未命中计数与内存缓存一样只在锁内修改
+        with self._lock:
+            response = self._memory.get(key)
+            if response is not None:
+                self.hits += 1
+
+        if response is None:
+            try:
+                response = read_json(self.cache_dir / f"{key}.json")
+            except (OSError, ValueError):
+                with self._lock:
+                    self.misses += 1
+                return None
+            with self._lock:
+                self._memory[key] = response
+                self.hits += 1
+
+        # 调用方会在响应上附加期望结果等字段，返回副本避免污染缓存
+        return copy.deepcopy(response)
+
+    def stats_line(self) -> str:
+        """本次运行的缓存命中统计，用于运行结束时的汇总输出"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return f"API响应缓存: 命中 {hits} 次, 未命中 {misses} 次"
+
+    def set(self, key: str, response: Dict[str, Any]):
+        """写入一次成功的响应"""
+        if not response.get('success'):
+            return
+
+        response = copy.deepcopy(response)
+        with self._lock:
+            self._memory[key] = response
+
+        try:
+            tmp_path = self.cache_dir / f"{key}.{threading.get_ident()}.tmp"
+            write_json(response, tmp_path)
+            os.replace(tmp_path, self.cache_dir / f"{key}.json")
+        except (OSError, TypeError) as e:
+            print(f"⚠️  响应缓存写入失败，已忽略: {e}")
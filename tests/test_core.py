@@ -2,59 +2,61 @@
 """
 核心功能测试
 测试数据加载、评估和API管理功能
+
+并行运行: pytest -n 3 tests/test_core.py  (需要 pytest-xdist)
 """
 
+import os
 import sys
-import json
+import threading
 from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
 
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
 
 from src.data_loader import DataLoader
-from src.evaluator import Evaluator
+from src.evaluator import Evaluator, _score
 from src.api_manager import APIManager
+from src.utils.response_cache import ResponseCache
+from api_clients import _rate_limit
+from api_clients._rate_limit import RateLimiter
+
+
+@pytest.fixture(scope="session")
+def data_loader():
+    """整个测试会话共用一个数据加载器"""
+    return DataLoader()
+
 
-def test_data_loading():
+def test_data_loading(data_loader):
     """测试数据加载功能"""
-    print("🧪 测试数据加载功能...")
-    
-    data_loader = DataLoader()
-    test_data_path = Path("test_set")
-    
+    test_data_path = project_root / "test_set"
     if not test_data_path.exists():
-        print("❌ test_set 目录不存在，跳过数据加载测试")
-        return False
-    
-    try:
-        # 测试获取文件列表
-        files = data_loader.get_diagnostic_files(test_data_path, max_files=3)
-        print(f"✅ 获取到 {len(files)} 个测试文件")
-        
-        # 测试ID范围过滤
-        range_files = data_loader.get_reports_by_id_range(test_data_path, start_id=4000, end_id=4002)
-        print(f"✅ ID范围过滤: 找到 {len(range_files)} 个文件")
-        
-        # 测试加载单个Report
-        if files:
-            report_data = data_loader.load_report_data(files[0])
-            print(f"✅ 成功加载Report: {report_data['report_id']}")
-            print(f"   症状数量: {report_data['total_symptoms']}")
-            print(f"   有效症状: {report_data['valid_symptoms']}")
-        
-        return True
-        
-    except Exception as e:
-        print(f"❌ 数据加载测试失败: {e}")
-        return False
+        pytest.skip("test_set 目录不存在，跳过数据加载测试")
+
+    # 测试获取文件列表
+    files = data_loader.get_diagnostic_files(test_data_path, max_files=3)
+    assert len(files) <= 3
+
+    # 测试ID范围过滤
+    range_files = data_loader.get_reports_by_id_range(test_data_path, start_id=4000, end_id=4002)
+    assert len(range_files) <= 3
+
+    # 测试加载单个Report
+    if files:
+        report_data = data_loader.load_report_data(files[0])
+        assert 'report_id' in report_data
+        assert report_data['valid_symptoms'] <= report_data['total_symptoms']
+
 
 def test_evaluation():
     """测试评估功能"""
-    print("\n🧪 测试评估功能...")
-    
     evaluator = Evaluator()
-    
+
     # 模拟测试数据
     mock_api_response = {
         'success': True,
@@ -62,82 +64,240 @@ def test_evaluation():
             'anatomicalLocations': ['Heart', 'Lung']
         }
     }
-    
+
     mock_expected_results = [
         {'anatomicalLocations': ['Heart']},
         {'anatomicalLocations': ['Lung']}
     ]
-    
-    try:
-        # 测试单个响应评估
-        evaluation = evaluator.evaluate_single_response(mock_api_response, mock_expected_results)
-        print(f"✅ 评估完成:")
-        print(f"   综合得分: {evaluation['overall_score']}")
-        print(f"   精确率: {evaluation['precision']}%")
-        print(f"   召回率: {evaluation['recall']}%")
-        print(f"   过度生成惩罚: {evaluation['overgeneration_penalty']}%")
-        
-        return True
-        
-    except Exception as e:
-        print(f"❌ 评估测试失败: {e}")
-        return False
+
+    # 测试单个响应评估
+    evaluation = evaluator.evaluate_single_response(mock_api_response, mock_expected_results)
+    assert evaluation['overall_score'] == 100.0
+    assert evaluation['precision'] == 100.0
+    assert evaluation['recall'] == 100.0
+    assert evaluation['overgeneration_penalty'] == 100.0
+
+    # 相同的位置组合再次评估时命中缓存，且结果一致
+    hits = _score.cache_info().hits
+    reordered = {'success': True, 'parsed_response': {'anatomicalLocations': ['Lung', 'Heart']}}
+    assert evaluator.evaluate_single_response(reordered, mock_expected_results) == evaluation
+    assert _score.cache_info().hits == hits + 1
+
+
+def test_evaluation_failed_response():
+    """测试API调用失败时的评估结果"""
+    evaluator = Evaluator()
+
+    evaluation = evaluator.evaluate_single_response({'success': False}, [{'anatomicalLocations': ['Heart']}])
+    assert evaluation['overall_score'] == 0.0
+    assert evaluation['detailed_analysis'] == 'API调用失败'
+
 
 def test_api_management():
     """测试API管理功能"""
-    print("\n🧪 测试API管理功能...")
-    
     api_manager = APIManager()
-    
-    try:
-        # 测试客户端数量
-        client_count = api_manager.get_client_count()
-        print(f"✅ 初始客户端数量: {client_count}")
-        
-        # 测试客户端名称列表
-        client_names = api_manager.get_client_names()
-        print(f"✅ 支持的客户端: {', '.join(client_names)}")
-        
-        return True
-        
-    except Exception as e:
-        print(f"❌ API管理测试失败: {e}")
-        return False
-
-def main():
-    """主测试函数"""
-    print("🚀 开始核心功能测试")
-    print("=" * 50)
-    
-    tests = [
-        ("数据加载", test_data_loading),
-        ("评估功能", test_evaluation),
-        ("API管理", test_api_management)
+
+    # 未初始化时没有任何客户端
+    assert api_manager.get_client_count() == 0
+    assert api_manager.get_client_names() == []
+    assert set(api_manager.client_classes) == {'openai', 'anthropic', 'gemini', 'moonshot', 'deepseek'}
+
+
+def test_response_cache_hit_after_set(tmp_path):
+    """写入成功响应后同一键命中，并计入命中/未命中次数"""
+    cache = ResponseCache(tmp_path)
+    key = cache.make_key('openai', 'gpt', 'sys', 'Chest pain')
+
+    assert cache.get(key) is None
+    cache.set(key, {'success': True, 'content': 'Heart'})
+    assert cache.get(key) == {'success': True, 'content': 'Heart'}
+
+    # 新实例从磁盘读取
+    reloaded = ResponseCache(tmp_path)
+    assert reloaded.get(key) == {'success': True, 'content': 'Heart'}
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert (reloaded.hits, reloaded.misses) == (1, 0)
+    assert cache.stats_line() == "API响应缓存: 命中 1 次, 未命中 1 次"
+
+
+def test_response_cache_key_normalization(tmp_path):
+    """normalize=True 忽略大小写和空白差异，False 按原文匹配；额外参数参与键计算"""
+    normalized = ResponseCache(tmp_path / 'n')
+    exact = ResponseCache(tmp_path / 'e', normalize=False)
+
+    assert normalized.make_key('a', 'm', 's', 'Chest  Pain ') == normalized.make_key('a', 'm', 's', 'chest pain')
+    assert exact.make_key('a', 'm', 's', 'Chest  Pain ') != exact.make_key('a', 'm', 's', 'chest pain')
+    assert exact.make_key('a', 'm', 's', 'u', max_tokens=50) != exact.make_key('a', 'm', 's', 'u', max_tokens=500)
+
+
+def test_response_cache_skips_failed_response(tmp_path):
+    """失败的响应不写入缓存"""
+    cache = ResponseCache(tmp_path)
+    cache.set('k', {'success': False, 'error': 'timeout'})
+
+    assert cache.get('k') is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_response_cache_get_returns_copy(tmp_path):
+    """修改 get 返回的响应不影响缓存内容"""
+    cache = ResponseCache(tmp_path)
+    cache.set('k', {'success': True, 'regions': ['Heart']})
+
+    first = cache.get('k')
+    first['regions'].append('Lung')
+    first['cached'] = True
+
+    assert cache.get('k') == {'success': True, 'regions': ['Heart']}
+
+
+def test_response_cache_corrupt_file_is_miss(tmp_path):
+    """损坏的缓存文件按未命中处理"""
+    cache = ResponseCache(tmp_path)
+    (tmp_path / 'k.json').write_text('{"success": tr', encoding='utf-8')
+
+    assert cache.get('k') is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+class _EchoBatchClient:
+    """按 custom_id 返回对应请求文本的批处理客户端替身"""
+
+    def run_batch(self, requests, input_path, **kwargs):
+        return {
+            custom_id: {'success': True, 'response': user_prompt}
+            for custom_id, _, user_prompt in requests
+        }
+
+
+def test_batch_results_map_to_symptoms(tmp_path):
+    """批处理结果按报告内的症状序号放回，症状ID缺失或重复也不会串位"""
+    from main_workflow import MainWorkflow
+
+    workflow = object.__new__(MainWorkflow)
+    workflow.evaluator = Evaluator()
+    reports = [
+        {'report_id': 1, 'symptoms': [
+            {'symptom_id': 's1', 'symptom_text': 'Chest pain'},
+            {'symptom_id': 's1', 'symptom_text': 'Shortness of breath'},
+            {'symptom_text': 'Headache'},
+        ]},
+        {'report_id': 2, 'symptoms': [
+            {'symptom_id': 's1', 'symptom_text': 'Abdominal pain'},
+        ]},
     ]
-    
-    passed = 0
-    total = len(tests)
-    
-    for test_name, test_func in tests:
-        try:
-            if test_func():
-                passed += 1
-                print(f"✅ {test_name} 测试通过")
-            else:
-                print(f"❌ {test_name} 测试失败")
-        except Exception as e:
-            print(f"❌ {test_name} 测试异常: {e}")
-    
-    print("\n" + "=" * 50)
-    print(f"📊 测试结果: {passed}/{total} 通过")
-    
-    if passed == total:
-        print("🎉 所有核心功能测试通过！")
-        return True
-    else:
-        print("⚠️  部分测试失败，请检查相关功能")
-        return False
-
-if __name__ == "__main__":
-    success = main()
-    sys.exit(0 if success else 1)
+
+    client = _EchoBatchClient()
+    requests = workflow._build_batch_requests(reports)
+    batch_results = client.run_batch(
+        [(f"{key}:openai", 'sys', text) for key, text in requests], tmp_path / 'batch.jsonl'
+    )
+    assert len(batch_results) == 4
+
+    for report in reports:
+        report_results = workflow._assemble_batch_report(report, batch_results, ['openai'], 'now')
+        assert [symptom['api_responses']['openai']['response'] for symptom in report_results['symptoms']] == \
+            [symptom['symptom_text'] for symptom in report['symptoms']]
+
+
+class _FakeClock:
+    """可手动推进的 time.monotonic 替身"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_limiter(monkeypatch):
+    """时间由 _FakeClock 控制的限流器工厂；等待时直接推进时钟并记录等待时长"""
+    clock = _FakeClock()
+    monkeypatch.setattr(_rate_limit, 'time', SimpleNamespace(monotonic=clock))
+    waits = []
+
+    class _Cond(threading.Condition):
+        def wait(self, timeout=None):
+            waits.append(timeout)
+            clock.now += timeout
+            return False
+
+    def make(**kwargs):
+        limiter = RateLimiter(**kwargs)
+        limiter._cond = _Cond()
+        return limiter
+
+    return make, clock, waits
+
+
+def test_rate_limiter_rpm(fake_limiter):
+    """请求数达到RPM后等待最早的请求滑出窗口"""
+    make, clock, waits = fake_limiter
+    limiter = make(requests_per_minute=2)
+
+    limiter.acquire()
+    clock.now += 10
+    limiter.acquire()
+    assert waits == []
+
+    limiter.acquire()
+    assert waits == [50.0]
+    assert len(limiter._events) == 2
+
+
+def test_rate_limiter_tpm(fake_limiter):
+    """token数超过TPM时等待，直到足够的token滑出窗口"""
+    make, clock, waits = fake_limiter
+    limiter = make(tokens_per_minute=1000)
+
+    limiter.acquire(600)
+    clock.now += 5
+    limiter.acquire(300)
+    assert waits == []
+
+    limiter.acquire(200)
+    assert waits == [55.0]
+    assert limiter._tokens_in_window == 500
+
+
+def test_rate_limiter_oversize_request_when_empty(fake_limiter):
+    """窗口为空时超过TPM的单个请求也立即放行"""
+    make, clock, waits = fake_limiter
+    limiter = make(tokens_per_minute=1000)
+
+    limiter.acquire(5000)
+    assert waits == []
+    assert limiter._tokens_in_window == 5000
+
+
+def test_rate_limiter_window_expiry(fake_limiter):
+    """超出窗口的请求不再计入额度"""
+    make, clock, waits = fake_limiter
+    limiter = make(requests_per_minute=1, tokens_per_minute=100)
+
+    limiter.acquire(80)
+    clock.now += 60
+    limiter.acquire(80)
+
+    assert waits == []
+    assert len(limiter._events) == 1
+    assert limiter._tokens_in_window == 80
+
+
+def test_find_latest_file_sees_new_files(tmp_path):
+    """新增文件后返回新文件，即使目录mtime未变化（粗粒度时间戳）"""
+    from rerun_with_rag import _find_latest_file
+
+    patterns = ('report_1_*.json',)
+    (tmp_path / 'report_1_a.json').write_text('{}')
+    (tmp_path / 'report_2_a.json').write_text('{}')
+    assert _find_latest_file(tmp_path, patterns) == str(tmp_path / 'report_1_a.json')
+
+    dir_stat = os.stat(tmp_path)
+    (tmp_path / 'report_1_b.json').write_text('{}')
+    os.utime(tmp_path, ns=(dir_stat.st_atime_ns, dir_stat.st_mtime_ns))
+
+    assert _find_latest_file(tmp_path, patterns) == str(tmp_path / 'report_1_b.json')
+    assert _find_latest_file(tmp_path, patterns, exclude=('_b',)) == str(tmp_path / 'report_1_a.json')
@@ -0,0 +1,52 @@
+"""
+调试工具包
+统一完成项目根目录入路径与 .env 加载，常用类按需从此处导入：
+
+    from tools import APIManager, ConfigLoader, OpenAIClient
+"""
+
+import importlib
+import os
+import sys
+from types import MappingProxyType
+
+# 项目根目录与 .env 路径只在导入时用 os.path 计算一次
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_ENV_PATH = os.path.join(_ROOT, "config", ".env")
+
+# 添加项目根目录到路径
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+# 加载环境变量：包只会被导入一次，各工具脚本不再重复加载
+from dotenv import load_dotenv
+load_dotenv(_ENV_PATH)
+
+# 各提供商API密钥在 .env 加载后只读取一次，工具脚本统一从 ENV 取值
+API_KEY_VARS = (
+    "OPENAI_API_KEY",
+    "ANTHROPIC_API_KEY",
+    "GEMINI_API_KEY",
+    "MOONSHOT_API_KEY",
+    "DEEPSEEK_API_KEY",
+)
+ENV = MappingProxyType({key: os.environ.get(key) for key in API_KEY_VARS})
+
+# 对外导出的类及其所在模块，首次访问时才导入
+_EXPORTS = {
+    'APIManager': 'src.api_manager',
+    'ConfigLoader': 'src.config_loader',
+    'OpenAIClient': 'api_clients.openai_client',
+    'AnthropicClient': 'api_clients.anthropic_client',
+    'GeminiClient': 'api_clients.gemini_client',
+    'MoonshotClient': 'api_clients.moonshot_client',
+    'DeepseekClient': 'api_clients.deepseek_client',
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'tools' has no attribute '{name}'")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+调试工具共用的输出辅助函数
+"""
+
+import functools
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+
+@functools.lru_cache(maxsize=1024)
+def preview(text: str, n: Optional[int] = 100) -> str:
+    """截断过长的文本用于日志显示，未超长时原样返回不做拷贝
+
+    命中响应缓存时同一段文本会反复出现，截断结果按 (文本, 长度) 缓存
+    """
+    if n is None or len(text) <= n:
+        return text
+    return text[:n] + "..."
+
+
+def show_response(tag: str, response: Dict[str, Any], width: Optional[int] = 30) -> bool:
+    """打印一次API调用的结果摘要，返回是否成功"""
+    ok = response.get('success')
+    if ok:
+        print(f"✅ {tag}成功: {preview(response['response'], width)}")
+    else:
+        print(f"❌ {tag}失败: {response.get('error')}")
+    return bool(ok)
+
+
+class _ThreadLocalStdout:
+    """并发执行时按线程缓存print输出，未登记缓存的线程照常写入原始stdout"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        return (buffer if buffer is not None else self._stream).write(text)
+
+    def flush(self):
+        self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def run_concurrently(tests: List[Tuple[str, Callable[[], Any]]],
+                     max_workers: Optional[int] = None) -> List[Tuple[str, Any, Optional[Exception], str]]:
+    """并发运行互不依赖的I/O型测试，按原顺序返回 (名称, 结果, 异常, 输出)
+
+    max_workers 限制同时进行的测试数量，默认全部同时运行
+    """
+    proxy = _ThreadLocalStdout(sys.stdout)
+
+    def _run(func):
+        proxy._local.buffer = io.StringIO()
+        try:
+            return func(), None, proxy._local.buffer.getvalue()
+        except Exception as e:
+            return None, e, proxy._local.buffer.getvalue()
+        finally:
+            proxy._local.buffer = None
+
+    original_stdout = sys.stdout
+    sys.stdout = proxy
+    try:
+        with ThreadPoolExecutor(max_workers=max(min(len(tests), max_workers or len(tests)), 1)) as executor:
+            futures = [executor.submit(_run, func) for _, func in tests]
+            outcomes = [future.result() for future in futures]
+    finally:
+        sys.stdout = original_stdout
+
+    return [(name, *outcome) for (name, _), outcome in zip(tests, outcomes)]
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+调试工具共用的LLM响应磁盘缓存
+对完全相同的探测请求（提供商、模型、提示词、参数一致）直接返回上次的成功响应，
+设置环境变量 RAG_EVAL_NOCACHE=1 可强制重新请求；存储由 src.utils.response_cache.ResponseCache 完成
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from src.utils.response_cache import ResponseCache
+
+CACHE_DIR = Path(__file__).parent.parent / ".cache" / "llm"
+
+_cache = None
+
+
+def _get_cache() -> ResponseCache:
+    """首次使用时才创建缓存目录"""
+    global _cache
+    if _cache is None:
+        # 探测请求按原文精确匹配
+        _cache = ResponseCache(CACHE_DIR, normalize=False)
+    return _cache
+
+
+def cache_key(provider: str, model: str, system_prompt: str, user_prompt: str,
+              max_tokens: int, temperature: float) -> str:
+    """由请求的全部决定性参数生成缓存键"""
+    return _get_cache().make_key(provider, model, system_prompt, user_prompt,
+                                 max_tokens=max_tokens, temperature=temperature)
+
+
+def get_cached(key: str) -> Optional[Dict[str, Any]]:
+    """读取缓存的响应，未命中或已禁用缓存时返回None"""
+    if os.getenv('RAG_EVAL_NOCACHE') == '1':
+        return None
+    return _get_cache().get(key)
+
+
+def set_cached(key: str, response: Dict[str, Any]):
+    """写入一次成功的响应"""
+    _get_cache().set(key, response)
+
+
+def cached_response(provider: str, client, system_prompt: str, user_prompt: str,
+                    max_tokens: int = 1000, temperature: float = 0.1) -> Dict[str, Any]:
+    """带磁盘缓存的 client.generate_response"""
+    key = cache_key(provider, getattr(client, 'model', ''), system_prompt, user_prompt, max_tokens, temperature)
+    response = get_cached(key)
+    if response is not None:
+        print("♻️  命中响应缓存")
+        return response
+
+    response = client.generate_response(
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        max_tokens=max_tokens,
+        temperature=temperature
+    )
+    set_cached(key, response)
+    return response
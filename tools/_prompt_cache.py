@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+调试工具共用的语义相似度响应缓存
+对措辞略有差异的同一症状探测（如 "80mm aortic valve gradient" 与
+"80 millimeter aortic valve gradient"）直接复用已缓存的API响应，
+设置环境变量 RAG_EVAL_NOCACHE=1 可强制重新请求
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+# 与检索侧保持一致的向量模型与距离阈值
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+CACHE_DISTANCE_THRESHOLD = 0.45
+CACHE_DIR = Path(__file__).parent.parent / ".cache" / "semantic"
+
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    np = None
+    SentenceTransformer = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+
+class SemanticCache:
+    """基于句向量余弦相似度的近似响应缓存"""
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, threshold: float = CACHE_DISTANCE_THRESHOLD, top_k: int = 3):
+        self.cache_dir = Path(cache_dir)
+        self.threshold = threshold
+        self.top_k = top_k
+        self.enabled = SentenceTransformer is not None
+        self._encoder = None
+        self._index = None
+        self._embeddings = None
+        self._entries = []
+
+        if not self.enabled:
+            print("⚠️  sentence-transformers 未安装，语义缓存已禁用")
+            return
+
+        self._load()
+
+    def lookup(self, model: str, system_prompt: str, user_prompt: str,
+               max_tokens: int = 1000, temperature: float = 0.1) -> Optional[Dict[str, Any]]:
+        """查找语义相近且请求参数相同的已缓存响应，未命中返回None"""
+        if not self.enabled or not self._entries:
+            return None
+
+        prompt_hash = self._hash(system_prompt)
+        query = self._embed(user_prompt)
+        k = min(self.top_k, len(self._entries))
+
+        if self._index is not None:
+            scores, ids = self._index.search(query, k)
+            candidates = zip(scores[0], ids[0])
+        else:
+            sims = self._embeddings @ query[0]
+            top = np.argsort(-sims)[:k]
+            candidates = zip(sims[top], top)
+
+        for score, idx in candidates:
+            if score < 1 - self.threshold:
+                break
+            entry = self._entries[idx]
+            if (entry['model'] == model and entry['system_prompt_hash'] == prompt_hash
+                    and entry.get('max_tokens') == max_tokens and entry.get('temperature') == temperature):
+                return entry['response']
+        return None
+
+    def store(self, model: str, system_prompt: str, user_prompt: str, response: Dict[str, Any],
+              max_tokens: int = 1000, temperature: float = 0.1):
+        """缓存一次成功的响应并持久化到磁盘"""
+        if not self.enabled or not response.get('success'):
+            return
+
+        vector = self._embed(user_prompt)
+        self._add_vectors(vector)
+        self._entries.append({
+            'model': model,
+            'system_prompt_hash': self._hash(system_prompt),
+            'user_prompt': user_prompt,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'response': response
+        })
+        self._save()
+
+    def _embed(self, text: str):
+        """生成L2归一化的句向量"""
+        if self._encoder is None:
+            self._encoder = SentenceTransformer(EMBEDDING_MODEL)
+        vector = self._encoder.encode([text], normalize_embeddings=True)
+        return np.asarray(vector, dtype='float32')
+
+    def _add_vectors(self, vectors):
+        if self._embeddings is None:
+            self._embeddings = vectors
+        else:
+            self._embeddings = np.vstack([self._embeddings, vectors])
+
+        if faiss is not None:
+            if self._index is None:
+                self._index = faiss.IndexFlatIP(vectors.shape[1])
+            self._index.add(vectors)
+
+    def _load(self):
+        """从磁盘恢复缓存"""
+        embeddings_path = self.cache_dir / "embeddings.npy"
+        entries_path = self.cache_dir / "entries.json"
+        if not embeddings_path.exists() or not entries_path.exists():
+            return
+
+        try:
+            with open(entries_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            embeddings = np.load(embeddings_path).astype('float32')
+            if len(embeddings) != len(entries):
+                raise ValueError(f"向量数 {len(embeddings)} 与条目数 {len(entries)} 不一致")
+            self._add_vectors(embeddings)
+            self._entries = entries
+        except Exception as e:
+            print(f"⚠️  语义缓存加载失败，已忽略: {e}")
+            self._index = None
+            self._embeddings = None
+            self._entries = []
+
+    def _save(self):
+        """先写临时文件再替换，中断的写入不会留下截断的缓存文件"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        embeddings_tmp = self.cache_dir / "embeddings.npy.tmp"
+        with open(embeddings_tmp, 'wb') as f:
+            np.save(f, self._embeddings)
+        entries_tmp = self.cache_dir / "entries.json.tmp"
+        with open(entries_tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(embeddings_tmp, self.cache_dir / "embeddings.npy")
+        os.replace(entries_tmp, self.cache_dir / "entries.json")
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+_semantic_cache = None
+
+
+def cached_generate(client, system_prompt: str, user_prompt: str,
+                    max_tokens: int = 1000, temperature: float = 0.1) -> Dict[str, Any]:
+    """先查语义缓存，未命中或设置了 RAG_EVAL_NOCACHE=1 时调用客户端并写回缓存"""
+    global _semantic_cache
+    if _semantic_cache is None:
+        _semantic_cache = SemanticCache()
+
+    model = getattr(client, 'model', '')
+    if os.getenv('RAG_EVAL_NOCACHE') != '1':
+        cached = _semantic_cache.lookup(model, system_prompt, user_prompt, max_tokens, temperature)
+        if cached is not None:
+            print("♻️  命中语义缓存")
+            return cached
+
+    response = client.generate_response(
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        max_tokens=max_tokens,
+        temperature=temperature
+    )
+    _semantic_cache.store(model, system_prompt, user_prompt, response, max_tokens, temperature)
+    return response
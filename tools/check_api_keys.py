@@ -8,12 +8,12 @@ import os
 import sys
 from pathlib import Path
 
-# 添加项目根目录到路径
-project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
+# 添加项目根目录到路径，.env 加载等公共准备由 tools 包完成
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
-from src.api_manager import APIManager
-from src.config_loader import ConfigLoader
+from tools import APIManager, ConfigLoader
 
 def check_api_keys():
     """检查所有API密钥配置"""
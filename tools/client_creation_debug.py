@@ -5,16 +5,16 @@
 
 import os
 import sys
+import asyncio
 from pathlib import Path
 
-# 添加项目根目录到路径
-project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
+# 添加项目根目录到路径，.env 加载等公共准备由 tools 包完成
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
-# 加载环境变量
-from dotenv import load_dotenv
-env_path = Path(__file__).parent.parent / "config" / ".env"
-load_dotenv(env_path)
+from tools import OpenAIClient, APIManager, ConfigLoader
+from tools._console import show_response
 
 def debug_client_creation():
     """调试客户端创建过程"""
@@ -22,9 +22,6 @@ def debug_client_creation():
     print("=" * 60)
     
     try:
-        from src.api_manager import APIManager
-        from src.config_loader import ConfigLoader
-        
         # 加载配置
         config_loader = ConfigLoader()
         config = config_loader.config
@@ -45,64 +42,52 @@ def debug_client_creation():
         
         # 手动创建OpenAI客户端（模拟API管理器的过程）
         print("\n🔧 手动创建OpenAI客户端...")
-        from api_clients.openai_client import OpenAIClient
         
         # 方式1：使用完全相同的参数
-        print("📞 方式1: 完全相同的参数")
         client1 = OpenAIClient(
             api_key=api_key,
             base_url=openai_config['base_url'],
             model=openai_config['model']
         )
         
-        response1 = client1.generate_response(
-            system_prompt="You are a helpful assistant.",
-            user_prompt="Say hello",
-            max_tokens=50
-        )
-        
-        if response1.get('success'):
-            print(f"✅ 方式1成功: {response1['response'][:30]}...")
-        else:
-            print(f"❌ 方式1失败: {response1.get('error')}")
-        
         # 方式2：使用默认参数（成功的测试脚本方式）
-        print("\n📞 方式2: 默认参数（测试脚本方式）")
         client2 = OpenAIClient(
             api_key=api_key,
             model="gpt-4"
         )
         
-        response2 = client2.generate_response(
-            system_prompt="You are a helpful assistant.",
-            user_prompt="Say hello",
-            max_tokens=50
-        )
-        
-        if response2.get('success'):
-            print(f"✅ 方式2成功: {response2['response'][:30]}...")
-        else:
-            print(f"❌ 方式2失败: {response2.get('error')}")
-        
         # 方式3：通过API管理器
-        print("\n📞 方式3: 通过API管理器")
+        client3 = None
         if api_manager.initialize_clients(config):
-            openai_client = api_manager.clients.get('openai')
-            if openai_client:
-                response3 = openai_client.generate_response(
+            client3 = api_manager.clients.get('openai')
+        
+        probes = [("方式1", "完全相同的参数", client1), ("方式2", "默认参数（测试脚本方式）", client2)]
+        if client3:
+            probes.append(("方式3", "通过API管理器", client3))
+        
+        # 三种方式互不依赖，并发发出请求
+        async def _all():
+            return await asyncio.gather(*(
+                client.agenerate_response(
                     system_prompt="You are a helpful assistant.",
                     user_prompt="Say hello",
                     max_tokens=50
                 )
-                
-                if response3.get('success'):
-                    print(f"✅ 方式3成功: {response3['response'][:30]}...")
-                else:
-                    print(f"❌ 方式3失败: {response3.get('error')}")
-            else:
+                for _, _, client in probes
+            ))
+        
+        responses = asyncio.run(_all())
+        
+        for (tag, desc, _), response in zip(probes, responses):
+            print(f"\n📞 {tag}: {desc}")
+            show_response(tag, response)
+        
+        if not client3:
+            print("\n📞 方式3: 通过API管理器")
+            if api_manager.clients:
                 print("❌ 无法从API管理器获取OpenAI客户端")
-        else:
-            print("❌ API管理器初始化失败")
+            else:
+                print("❌ API管理器初始化失败")
             
     except Exception as e:
         print(f"❌ 调试过程异常: {e}")
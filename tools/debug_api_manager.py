@@ -8,14 +8,13 @@ import os
 import sys
 from pathlib import Path
 
-# 添加项目根目录到路径
-project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
+# 添加项目根目录到路径，.env 加载等公共准备由 tools 包完成
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
-# 加载环境变量
-from dotenv import load_dotenv
-env_path = Path(__file__).parent.parent / "config" / ".env"
-load_dotenv(env_path)
+from tools import OpenAIClient, APIManager, ConfigLoader
+from tools._console import show_response
 
 def test_direct_api_call():
     """直接测试API调用（类似测试脚本）"""
@@ -24,7 +23,6 @@ def test_direct_api_call():
     
     # 测试OpenAI
     try:
-        from api_clients.openai_client import OpenAIClient
         api_key = os.getenv('OPENAI_API_KEY')
         print(f"OpenAI密钥: {api_key[:10]}...{api_key[-10:] if api_key else 'None'}")
         
@@ -35,10 +33,7 @@ def test_direct_api_call():
             max_tokens=50
         )
         
-        if response.get('success'):
-            print(f"✅ 直接调用OpenAI成功: {response['response'][:50]}...")
-        else:
-            print(f"❌ 直接调用OpenAI失败: {response.get('error')}")
+        show_response("直接调用OpenAI", response, width=50)
             
     except Exception as e:
         print(f"❌ 直接调用OpenAI异常: {e}")
@@ -49,9 +44,6 @@ def test_api_manager():
     print("=" * 50)
     
     try:
-        from src.api_manager import APIManager
-        from src.config_loader import ConfigLoader
-        
         # 加载配置
         config_loader = ConfigLoader()
         config = config_loader.config
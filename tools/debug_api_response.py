@@ -8,14 +8,14 @@ import os
 import sys
 from pathlib import Path
 
-# 添加项目根目录到路径
-project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
+# 添加项目根目录到路径，.env 加载等公共准备由 tools 包完成
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
-# 加载环境变量
-from dotenv import load_dotenv
-env_path = Path(__file__).parent.parent / "config" / ".env"
-load_dotenv(env_path)
+from tools import OpenAIClient, AnthropicClient
+from tools._console import preview
+from tools._prompt_cache import cached_generate
 
 def test_api_raw_response():
     """测试API的原始响应"""
@@ -28,12 +28,11 @@ def test_api_raw_response():
     # 测试OpenAI
     print(f"\n📞 测试OpenAI: {test_symptom}")
     try:
-        from api_clients.openai_client import OpenAIClient
-        
         api_key = os.getenv('OPENAI_API_KEY')
         client = OpenAIClient(api_key=api_key, model="gpt-4")
         
-        response = client.generate_response(
+        response = cached_generate(
+            client,
             system_prompt="You are a helpful assistant.",
             user_prompt=test_symptom,
             max_tokens=200
@@ -51,12 +50,11 @@ def test_api_raw_response():
     # 测试Anthropic
     print(f"\n📞 测试Anthropic: {test_symptom}")
     try:
-        from api_clients.anthropic_client import AnthropicClient
-        
         api_key = os.getenv('ANTHROPIC_API_KEY')
         client = AnthropicClient(api_key=api_key)
         
-        response = client.generate_response(
+        response = cached_generate(
+            client,
             system_prompt="You are a helpful assistant.",
             user_prompt=test_symptom,
             max_tokens=200
@@ -82,7 +80,7 @@ def test_with_system_prompt():
         with open(prompt_path, 'r', encoding='utf-8') as f:
             system_prompt = f.read()
         print(f"📄 系统提示词长度: {len(system_prompt)} 字符")
-        print(f"📄 前100字符: {system_prompt[:100]}...")
+        print(f"📄 前100字符: {preview(system_prompt)}")
     else:
         print("❌ 系统提示词文件不存在")
         return
@@ -92,12 +90,11 @@ def test_with_system_prompt():
     # 测试OpenAI
     print(f"\n📞 测试OpenAI (带系统提示词): {test_symptom}")
     try:
-        from api_clients.openai_client import OpenAIClient
-        
         api_key = os.getenv('OPENAI_API_KEY')
         client = OpenAIClient(api_key=api_key, model="gpt-4")
         
-        response = client.generate_response(
+        response = cached_generate(
+            client,
             system_prompt=system_prompt,
             user_prompt=test_symptom,
             max_tokens=500
@@ -7,14 +7,13 @@ import os
 import sys
 from pathlib import Path
 
-# 添加项目根目录到路径
-project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
+# 添加项目根目录到路径，.env 加载等公共准备由 tools 包完成
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
-# 加载环境变量
-from dotenv import load_dotenv
-env_path = Path(__file__).parent.parent / "config" / ".env"
-load_dotenv(env_path)
+from tools import APIManager, ConfigLoader
+from tools._console import preview
 
 def debug_full_workflow():
     """调试完整工作流流程"""
@@ -22,9 +21,6 @@ def debug_full_workflow():
     print("=" * 50)
     
     try:
-        from src.api_manager import APIManager
-        from src.config_loader import ConfigLoader
-        
         # 加载配置
         config_loader = ConfigLoader()
         config = config_loader.config
@@ -80,7 +76,7 @@ def debug_full_workflow():
                         
                         # 检查原始响应
                         if 'response' in response:
-                            print(f"  原始响应前100字符: {response['response'][:100]}...")
+                            print(f"  原始响应前100字符: {preview(response['response'])}")
                         
                         # 检查是否有其他相关字段
                         for key, value in response.items():
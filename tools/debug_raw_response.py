@@ -7,14 +7,14 @@ import os
 import sys
 from pathlib import Path
 
-# 添加项目根目录到路径
-project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
+# 添加项目根目录到路径，.env 加载等公共准备由 tools 包完成
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
-# 加载环境变量
-from dotenv import load_dotenv
-env_path = Path(__file__).parent.parent / "config" / ".env"
-load_dotenv(env_path)
+from tools import MoonshotClient
+from tools._console import preview
+from tools._prompt_cache import cached_generate
 
 def debug_raw_response():
     """调试原始响应格式"""
@@ -24,7 +24,6 @@ def debug_raw_response():
     try:
         # 测试Moonshot
         print("\n📞 测试Moonshot...")
-        from api_clients.moonshot_client import MoonshotClient
         
         api_key = os.getenv('MOONSHOT_API_KEY')
         client = MoonshotClient(api_key=api_key, model="moonshot-v1-8k")
@@ -33,7 +32,8 @@ def debug_raw_response():
         
         # 测试简单响应
         print("\n📞 测试简单响应...")
-        response1 = client.generate_response(
+        response1 = cached_generate(
+            client,
             system_prompt="You are a helpful assistant.",
             user_prompt="Say hello",
             max_tokens=50
@@ -52,7 +52,8 @@ def debug_raw_response():
             with open(prompt_path, 'r', encoding='utf-8') as f:
                 system_prompt = f.read()
             
-            response2 = client.generate_response(
+            response2 = cached_generate(
+                client,
                 system_prompt=system_prompt,
                 user_prompt="80 millimeter aortic valve gradient",
                 max_tokens=500
@@ -66,7 +67,7 @@ def debug_raw_response():
             
             # 检查原始响应
             if 'response' in response2:
-                print(f"📄 原始响应前200字符: {response2['response'][:200]}...")
+                print(f"📄 原始响应前200字符: {preview(response2['response'], 200)}")
         else:
             print("❌ 系统提示词文件不存在")
             
@@ -7,14 +7,13 @@ import os
 import sys
 from pathlib import Path
 
-# 添加项目根目录到路径
-project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
+# 添加项目根目录到路径，.env 加载等公共准备由 tools 包完成
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
-# 加载环境变量
-from dotenv import load_dotenv
-env_path = Path(__file__).parent.parent / "config" / ".env"
-load_dotenv(env_path)
+from tools import OpenAIClient, APIManager, ConfigLoader
+from tools._console import show_response
 
 def compare_openai_calls():
     """对比OpenAI的不同调用方式"""
@@ -27,8 +26,6 @@ def compare_openai_calls():
     # 方式1：直接调用（成功的方式）
     print("\n📞 方式1: 直接调用")
     try:
-        from api_clients.openai_client import OpenAIClient
-        
         client1 = OpenAIClient(api_key=api_key, model="gpt-4")
         print(f"客户端1 - 模型: gpt-4, base_url: 默认")
         
@@ -38,10 +35,7 @@ def compare_openai_calls():
             max_tokens=50
         )
         
-        if response1.get('success'):
-            print(f"✅ 直接调用成功: {response1['response'][:30]}...")
-        else:
-            print(f"❌ 直接调用失败: {response1.get('error')}")
+        show_response("直接调用", response1)
             
     except Exception as e:
         print(f"❌ 直接调用异常: {e}")
@@ -49,8 +43,6 @@ def compare_openai_calls():
     # 方式2：使用配置文件中的参数
     print("\n📞 方式2: 使用配置参数")
     try:
-        from api_clients.openai_client import OpenAIClient
-        
         # 模拟API管理器的调用方式
         client2 = OpenAIClient(
             api_key=api_key, 
@@ -65,10 +57,7 @@ def compare_openai_calls():
             max_tokens=50
         )
         
-        if response2.get('success'):
-            print(f"✅ 配置参数调用成功: {response2['response'][:30]}...")
-        else:
-            print(f"❌ 配置参数调用失败: {response2.get('error')}")
+        show_response("配置参数调用", response2)
             
     except Exception as e:
         print(f"❌ 配置参数调用异常: {e}")
@@ -76,9 +65,6 @@ def compare_openai_calls():
     # 方式3：通过API管理器
     print("\n📞 方式3: 通过API管理器")
     try:
-        from src.api_manager import APIManager
-        from src.config_loader import ConfigLoader
-        
         config_loader = ConfigLoader()
         config = config_loader.config
         api_manager = APIManager()
@@ -95,10 +81,7 @@ def compare_openai_calls():
                     max_tokens=50
                 )
                 
-                if response3.get('success'):
-                    print(f"✅ API管理器调用成功: {response3['response'][:30]}...")
-                else:
-                    print(f"❌ API管理器调用失败: {response3.get('error')}")
+                show_response("API管理器调用", response3)
             else:
                 print("❌ 无法从API管理器获取OpenAI客户端")
         else:
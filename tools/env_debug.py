@@ -9,7 +9,10 @@ from pathlib import Path
 
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from tools._console import show_response
 
 def check_env_before_api_manager():
     """检查导入API管理器之前的环境变量"""
@@ -67,10 +70,7 @@ def test_direct_with_both_keys():
                 max_tokens=50
             )
             
-            if response.get('success'):
-                print(f"✅ 使用第二个密钥直接调用成功")
-            else:
-                print(f"❌ 使用第二个密钥直接调用失败: {response.get('error')}")
+            show_response("使用第二个密钥直接调用", response)
                 
         except Exception as e:
             print(f"❌ 测试第二个密钥异常: {e}")
@@ -7,14 +7,13 @@ import os
 import sys
 from pathlib import Path
 
-# 添加项目根目录到路径
-project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
+# 添加项目根目录到路径，.env 加载等公共准备由 tools 包完成
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
-# 加载环境变量
-from dotenv import load_dotenv
-env_path = Path(__file__).parent.parent / "config" / ".env"
-load_dotenv(env_path)
+import tools  # noqa: F401  触发公共准备
+from tools._console import preview
 
 def force_test_openai():
     """强制测试OpenAI客户端"""
@@ -63,7 +62,7 @@ def force_test_openai():
             
             print(f"✅ 调用成功: {response2['success']}")
             if response2.get('success'):
-                print(f"📝 响应: {response2['response'][:200]}...")
+                print(f"📝 响应: {preview(response2['response'], 200)}")
                 print(f"🔍 解析数据: {response2.get('parsed_data', 'None')}")
                 print(f"💓 器官名称: {response2.get('organ_name', 'None')}")
                 print(f"📍 解剖位置: {response2.get('anatomical_locations', 'None')}")
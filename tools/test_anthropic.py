@@ -3,18 +3,28 @@
 专门测试Anthropic API连接
 """
 
-import os
+import asyncio
+import functools
+import importlib.util
+import socket
 import sys
 from pathlib import Path
 
-# 添加项目根目录到路径
-project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
+# 添加项目根目录到路径，.env 加载等公共准备由 tools 包完成
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
-# 加载环境变量
-from dotenv import load_dotenv
-env_path = Path(__file__).parent.parent / "config" / ".env"
-load_dotenv(env_path)
+from tools import ENV, AnthropicClient
+from tools._console import run_concurrently, show_response
+from api_clients._session_pool import anthropic_session
+
+@functools.lru_cache(maxsize=1)
+def _http_client():
+    """网络探测与Anthropic SDK共用的httpx客户端，探测时建立的连接留给后续API调用复用"""
+    import httpx
+    # 安装了 h2 时启用HTTP/2，否则使用HTTP/1.1 keep-alive
+    return httpx.Client(http2=importlib.util.find_spec("h2") is not None)
 
 def test_anthropic_connection():
     """测试Anthropic连接"""
@@ -22,7 +32,7 @@ def test_anthropic_connection():
     print("=" * 50)
     
     # 获取API密钥
-    api_key = os.getenv('ANTHROPIC_API_KEY')
+    api_key = ENV['ANTHROPIC_API_KEY']
     if not api_key:
         print("❌ ANTHROPIC_API_KEY 环境变量未设置")
         return False
@@ -33,9 +43,8 @@ def test_anthropic_connection():
     # 测试1: 直接使用anthropic包
     print("\n📞 测试1: 直接使用anthropic包")
     try:
-        import anthropic
-        
-        client = anthropic.Anthropic(api_key=api_key)
+        # 与网络探测、测试2共用同一个客户端及连接，TLS握手只做一次
+        client = anthropic_session(api_key, http_client=_http_client())
         print("✅ Anthropic客户端创建成功")
         
         # 测试简单请求
@@ -61,12 +70,11 @@ def test_anthropic_client():
     """测试Anthropic客户端类"""
     print("\n📞 测试2: 使用AnthropicClient类")
     try:
-        from api_clients.anthropic_client import AnthropicClient
-        
-        api_key = os.getenv('ANTHROPIC_API_KEY')
+        api_key = ENV['ANTHROPIC_API_KEY']
         client = AnthropicClient(
             api_key=api_key,
-            model="claude-3-5-sonnet-20241022"
+            model="claude-3-5-sonnet-20241022",
+            session=anthropic_session(api_key, http_client=_http_client())
         )
         
         print("✅ AnthropicClient创建成功")
@@ -78,33 +86,34 @@ def test_anthropic_client():
             max_tokens=50
         )
         
-        if response.get('success'):
-            print(f"✅ generate_response成功: {response['response']}")
-            return True
-        else:
-            print(f"❌ generate_response失败: {response.get('error')}")
-            return False
+        return show_response("generate_response", response, width=None)
             
     except Exception as e:
         print(f"❌ AnthropicClient测试异常: {e}")
         return False
 
+async def _probe_host(host: str):
+    """DNS解析与HEAD请求并发进行，返回 (地址列表, HTTP状态码)"""
+    loop = asyncio.get_running_loop()
+    # 先创建客户端：导入或构造失败时直接抛出，不会留下未等待的DNS协程
+    client = _http_client()
+    infos, response = await asyncio.gather(
+        loop.getaddrinfo(host, 443, type=socket.SOCK_STREAM),
+        # HEAD请求不下载响应体，连接保留在共用客户端中供API调用复用
+        asyncio.to_thread(client.head, f"https://{host}/", timeout=5)
+    )
+    return sorted({info[4][0] for info in infos}), response.status_code
+
 def test_network_connectivity():
     """测试网络连接"""
     print("\n🌐 测试网络连接")
     try:
-        import requests
-        
-        # 测试Anthropic API端点
-        url = "https://api.anthropic.com/v1"
-        response = requests.get(url, timeout=10)
-        print(f"✅ 网络连接测试: {response.status_code}")
-        
-        # 测试DNS解析
-        import socket
         host = "api.anthropic.com"
-        ip = socket.gethostbyname(host)
-        print(f"✅ DNS解析: {host} -> {ip}")
+        addresses, status_code = asyncio.run(_probe_host(host))
+        
+        # DNS解析（同时返回IPv4/IPv6地址）与Anthropic API端点连通性
+        print(f"✅ DNS解析: {host} -> {', '.join(addresses)}")
+        print(f"✅ 网络连接测试: {status_code}")
         
         return True
         
@@ -117,14 +126,21 @@ def main():
     print("🔍 Anthropic连接问题诊断")
     print("=" * 60)
     
-    # 测试网络连接
-    network_ok = test_network_connectivity()
-    
-    # 测试API连接
-    api_ok = test_anthropic_connection()
-    
-    # 测试客户端类
-    client_ok = test_anthropic_client()
+    # 网络连接、API连接、客户端类三项测试互不依赖，并发执行
+    tests = [
+        ("网络连接", test_network_connectivity),
+        ("API连接", test_anthropic_connection),
+        ("客户端类", test_anthropic_client)
+    ]
+    results = []
+    # 每个测试的日志在各自线程中缓存，最后整段一次写出
+    for name, ok, error, output in run_concurrently(tests):
+        if error is not None:
+            output += f"❌ {name} 测试异常: {error}\n"
+        sys.stdout.write(output)
+        results.append(bool(ok))
+    sys.stdout.flush()
+    network_ok, api_ok, client_ok = results
     
     # 总结
     print("\n📊 测试结果总结")
@@ -7,14 +7,12 @@ import os
 import sys
 from pathlib import Path
 
-# 添加项目根目录到路径
-project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
+# 添加项目根目录到路径，.env 加载等公共准备由 tools 包完成
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
-# 加载环境变量
-from dotenv import load_dotenv
-env_path = Path(__file__).parent.parent / "config" / ".env"
-load_dotenv(env_path)
+from tools import APIManager, ConfigLoader
 
 def test_fixed_system():
     """测试修复后的系统"""
@@ -22,9 +20,6 @@ def test_fixed_system():
     print("=" * 50)
     
     try:
-        from src.api_manager import APIManager
-        from src.config_loader import ConfigLoader
-        
         # 加载配置
         config_loader = ConfigLoader()
         config = config_loader.config
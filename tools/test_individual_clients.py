@@ -4,177 +4,59 @@
 逐个测试每个客户端的连接和响应
 """
 
-import os
+import functools
 import sys
 from pathlib import Path
 
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 
-def test_openai_client():
-    """测试OpenAI客户端"""
-    print("🔍 测试OpenAI客户端...")
-    try:
-        from api_clients.openai_client import OpenAIClient
-        
-        # 从环境变量获取API密钥
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            print("❌ OPENAI_API_KEY 环境变量未设置")
-            return False
-        
-        client = OpenAIClient(api_key=api_key, model="gpt-4")
-        
-        # 简单测试
-        response = client.generate_response(
-            system_prompt="You are a helpful assistant.",
-            user_prompt="Say hello",
-            max_tokens=50
-        )
-        
-        if response.get('success'):
-            print("✅ OpenAI客户端测试成功")
-            print(f"   响应: {response['response'][:100]}...")
-            return True
-        else:
-            print(f"❌ OpenAI客户端测试失败: {response.get('error')}")
-            return False
-            
-    except Exception as e:
-        print(f"❌ OpenAI客户端测试异常: {e}")
-        return False
+import tools
+from tools import ENV
+from tools._console import preview, run_concurrently
+from tools._llm_cache import cached_response
 
-def test_anthropic_client():
-    """测试Anthropic客户端"""
-    print("🔍 测试Anthropic客户端...")
-    try:
-        from api_clients.anthropic_client import AnthropicClient
-        
-        # 从环境变量获取API密钥
-        api_key = os.getenv('ANTHROPIC_API_KEY')
-        if not api_key:
-            print("❌ ANTHROPIC_API_KEY 环境变量未设置")
-            return False
-        
-        client = AnthropicClient(api_key=api_key)
-        
-        # 简单测试
-        response = client.generate_response(
-            system_prompt="You are a helpful assistant.",
-            user_prompt="Say hello",
-            max_tokens=50
-        )
-        
-        if response.get('success'):
-            print("✅ Anthropic客户端测试成功")
-            print(f"   响应: {response['response'][:100]}...")
-            return True
-        else:
-            print(f"❌ Anthropic客户端测试失败: {response.get('error')}")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Anthropic客户端测试异常: {e}")
-        return False
-
-def test_gemini_client():
-    """测试Gemini客户端"""
-    print("🔍 测试Gemini客户端...")
-    try:
-        from api_clients.google_client import GeminiClient
-        
-        # 从环境变量获取API密钥
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            print("❌ GEMINI_API_KEY 环境变量未设置")
-            return False
-        
-        client = GeminiClient(api_key=api_key)
-        
-        # 简单测试
-        response = client.generate_response(
-            system_prompt="You are a helpful assistant.",
-            user_prompt="Say hello",
-            max_tokens=50
-        )
-        
-        if response.get('success'):
-            print("✅ Gemini客户端测试成功")
-            print(f"   响应: {response['response'][:100]}...")
-            return True
-        else:
-            print(f"❌ Gemini客户端测试失败: {response.get('error')}")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Gemini客户端测试异常: {e}")
-        return False
+# 同时进行的探测请求上限，避免瞬时打满本地连接与各提供商的速率限制
+MAX_CONCURRENCY = 3
 
-def test_moonshot_client():
-    """测试Moonshot客户端"""
-    print("🔍 测试Moonshot客户端...")
-    try:
-        from api_clients.moonshot_client import MoonshotClient
-        
-        # 从环境变量获取API密钥
-        api_key = os.getenv('MOONSHOT_API_KEY')
-        if not api_key:
-            print("❌ MOONSHOT_API_KEY 环境变量未设置")
-            return False
-        
-        client = MoonshotClient(api_key=api_key)
-        
-        # 简单测试
-        response = client.generate_response(
-            system_prompt="You are a helpful assistant.",
-            user_prompt="Say hello",
-            max_tokens=50
-        )
-        
-        if response.get('success'):
-            print("✅ Moonshot客户端测试成功")
-            print(f"   响应: {response['response'][:100]}...")
-            return True
-        else:
-            print(f"❌ Moonshot客户端测试失败: {response.get('error')}")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Moonshot客户端测试异常: {e}")
-        return False
+# 提供商名称、客户端类、密钥环境变量、额外构造参数
+PROVIDERS = [
+    ("OpenAI", "OpenAIClient", "OPENAI_API_KEY", {"model": "gpt-4"}),
+    ("Anthropic", "AnthropicClient", "ANTHROPIC_API_KEY", {}),
+    ("Gemini", "GeminiClient", "GEMINI_API_KEY", {}),
+    ("Moonshot", "MoonshotClient", "MOONSHOT_API_KEY", {}),
+    ("Deepseek", "DeepseekClient", "DEEPSEEK_API_KEY", {})
+]
 
-def test_deepseek_client():
-    """测试Deepseek客户端"""
-    print("🔍 测试Deepseek客户端...")
+def probe_client(name: str, class_name: str, key_var: str, client_kwargs: dict) -> bool:
+    """测试单个提供商的客户端"""
+    print(f"🔍 测试{name}客户端...")
     try:
-        from api_clients.deepseek_client import DeepseekClient
-        
-        # 从环境变量获取API密钥
-        api_key = os.getenv('DEEPSEEK_API_KEY')
-        if not api_key:
-            print("❌ DEEPSEEK_API_KEY 环境变量未设置")
-            return False
-        
-        client = DeepseekClient(api_key=api_key)
+        # 客户端类经 tools 包按需导入，只加载需要测试的SDK
+        client_class = getattr(tools, class_name)
+        client = client_class(api_key=ENV[key_var], **client_kwargs)
         
         # 简单测试
-        response = client.generate_response(
+        response = cached_response(
+            name,
+            client,
             system_prompt="You are a helpful assistant.",
             user_prompt="Say hello",
             max_tokens=50
         )
         
         if response.get('success'):
-            print("✅ Deepseek客户端测试成功")
-            print(f"   响应: {response['response'][:100]}...")
+            print(f"✅ {name}客户端测试成功")
+            print(f"   响应: {preview(response['response'])}")
             return True
         else:
-            print(f"❌ Deepseek客户端测试失败: {response.get('error')}")
+            print(f"❌ {name}客户端测试失败: {response.get('error')}")
             return False
             
     except Exception as e:
-        print(f"❌ Deepseek客户端测试异常: {e}")
+        print(f"❌ {name}客户端测试异常: {e}")
         return False
 
 def main():
@@ -182,30 +64,32 @@ def main():
     print("🚀 开始测试单个API客户端")
     print("=" * 60)
     
-    # 加载环境变量
-    from dotenv import load_dotenv
-    # 指定.env文件的路径
-    env_path = Path(__file__).parent.parent / "config" / ".env"
-    load_dotenv(env_path)
+    # 汇总按原顺序列出全部提供商，未测试的记为失败
+    results = {provider[0]: False for provider in PROVIDERS}
     
-    tests = [
-        ("OpenAI", test_openai_client),
-        ("Anthropic", test_anthropic_client),
-        ("Gemini", test_gemini_client),
-        ("Moonshot", test_moonshot_client),
-        ("Deepseek", test_deepseek_client)
-    ]
+    # 未配置密钥的提供商直接跳过，不导入其SDK、不创建客户端
+    tests = []
+    for provider in PROVIDERS:
+        name, _, key_var, _ = provider
+        if ENV[key_var]:
+            tests.append((name, functools.partial(probe_client, *provider)))
+        else:
+            print(f"⏭️  跳过 {name}: {key_var} 环境变量未设置")
     
-    results = {}
+    if not tests:
+        print("❌ 未配置任何API密钥，请检查 config/.env")
+        return False
     
-    for name, test_func in tests:
-        print(f"\n{'='*20} {name} {'='*20}")
-        try:
-            success = test_func()
-            results[name] = success
-        except Exception as e:
-            print(f"❌ {name} 测试出现异常: {e}")
-            results[name] = False
+    # 各提供商互不依赖且均为网络I/O，并发执行后按顺序输出各自日志
+    # 每个测试的日志在各自线程中缓存，最后整段一次写出
+    for name, success, error, output in run_concurrently(tests, max_workers=MAX_CONCURRENCY):
+        block = f"\n{'='*20} {name} {'='*20}\n{output}"
+        if error is not None:
+            block += f"❌ {name} 测试出现异常: {error}\n"
+            success = False
+        sys.stdout.write(block)
+        results[name] = success
+    sys.stdout.flush()
     
     # 总结结果
     print("\n" + "=" * 60)
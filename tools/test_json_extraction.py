@@ -3,9 +3,52 @@
 测试JSON提取功能
 """
 
-import re
 import json
 
+try:
+    # orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，异常处理无需区分
+    from orjson import loads
+except ImportError:
+    from json import loads
+
+
+_DECODER = json.JSONDecoder()
+
+
+def parse_json(text):
+    """从第一个 '{' 开始一次性解码JSON对象，无需先提取再解析（自动跳过Markdown代码块标记）"""
+    start = text.find('{')
+    if start < 0:
+        return None
+    return _DECODER.raw_decode(text, start)[0]
+
+
+def extract_outer_braces(text):
+    """取第一个 '{' 到最后一个 '}' 之间的内容"""
+    start = text.find('{')
+    end = text.rfind('}')
+    if start < 0 or end < start:
+        return None
+    return text[start:end + 1]
+
+
+def try_extract(text):
+    """依次尝试两种提取方法，首个成功即返回 (方法名, 数据)，均失败返回 (None, None)"""
+    try:
+        data = parse_json(text)
+        if data is not None:
+            return "方法1", data
+    except json.JSONDecodeError:
+        pass
+
+    json_str = extract_outer_braces(text)
+    if json_str:
+        try:
+            return "方法2", loads(json_str)
+        except json.JSONDecodeError:
+            pass
+    return None, None
+
 def test_json_extraction():
     """测试JSON提取"""
     print("🧪 测试JSON提取功能")
@@ -32,43 +75,15 @@ def test_json_extraction():
     print(test_text)
     print("\n" + "="*50)
     
-    # 测试正则表达式
-    print("🔍 测试正则表达式...")
-    
-    # 方法1: 移除Markdown代码块标记
-    json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', test_text, re.DOTALL)
-    if json_match:
-        json_str = json_match.group(1)
-        print(f"✅ 方法1成功: {json_str[:100]}...")
-        
-        # 尝试解析JSON
-        try:
-            data = json.loads(json_str)
-            print(f"✅ JSON解析成功!")
-            print(f"   器官名称: {data['organs'][0]['organName']}")
-            print(f"   解剖位置: {data['organs'][0]['anatomicalLocations']}")
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON解析失败: {e}")
-    else:
-        print("❌ 方法1失败")
-    
-    # 方法2: 直接查找JSON
-    print("\n🔍 方法2: 直接查找JSON...")
-    json_match2 = re.search(r'(\{.*\})', test_text, re.DOTALL)
-    if json_match2:
-        json_str2 = json_match2.group(1)
-        print(f"✅ 方法2成功: {json_str2[:100]}...")
-        
-        # 尝试解析JSON
-        try:
-            data2 = json.loads(json_str2)
-            print(f"✅ JSON解析成功!")
-            print(f"   器官名称: {data2['organs'][0]['organName']}")
-            print(f"   解剖位置: {data2['organs'][0]['anatomicalLocations']}")
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON解析失败: {e}")
+    # 方法1（raw_decode 直接解码）成功时不再执行方法2（直接查找JSON）
+    print("🔍 提取JSON...")
+    method, data = try_extract(test_text)
+    if data is not None:
+        print(f"✅ {method}成功，JSON解析成功!")
+        print(f"   器官名称: {data['organs'][0]['organName']}")
+        print(f"   解剖位置: {data['organs'][0]['anatomicalLocations']}")
     else:
-        print("❌ 方法2失败")
+        print("❌ 两种方法均失败")
 
 def test_with_real_response():
     """使用真实API响应测试"""
@@ -103,22 +118,18 @@ def test_with_real_response():
     print(real_response)
     print("\n" + "="*50)
     
-    # 测试提取
-    json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', real_response, re.DOTALL)
-    if json_match:
-        json_str = json_match.group(1)
-        print(f"✅ JSON提取成功!")
-        
-        try:
-            data = json.loads(json_str)
+    # 测试提取并解析
+    try:
+        data = parse_json(real_response)
+        if data is not None:
             print(f"✅ JSON解析成功!")
             print(f"   找到 {len(data['organs'])} 个器官:")
             for i, organ in enumerate(data['organs']):
                 print(f"   {i+1}. {organ['organName']}: {organ['anatomicalLocations']}")
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON解析失败: {e}")
-    else:
-        print("❌ JSON提取失败")
+        else:
+            print("❌ JSON提取失败")
+    except json.JSONDecodeError as e:
+        print(f"❌ JSON解析失败: {e}")
 
 if __name__ == "__main__":
     test_json_extraction()